@@ -1,10 +1,13 @@
 import os
 import uvicorn
 
+from .settings import settings
+
 def main():
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
-    uvicorn.run("app.server:app", host=host, port=port, reload=False)
+    workers = max(1, settings.workers)
+    uvicorn.run("app.server:app", host=host, port=port, reload=False, workers=workers)
 
 if __name__ == "__main__":
     main()
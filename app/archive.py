@@ -4,20 +4,16 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, Any, List
 
+from . import clients, replica, segments
+from .hot_cache import hot_cache
 from .settings import settings
+from .shared import file_lock, shared_cache
 
-_SUPABASE = None
+_GENERATION = "archive"
 
 
 def _supabase_client():
-    global _SUPABASE
-    if _SUPABASE is not None:
-        return _SUPABASE
-    if not settings.supabase_url or not settings.supabase_service_role_key:
-        return None
-    from supabase import create_client
-    _SUPABASE = create_client(settings.supabase_url, settings.supabase_service_role_key)
-    return _SUPABASE
+    return clients.supabase_client()
 
 
 def _supabase_table():
@@ -46,6 +42,23 @@ def _preview(messages: List[Dict[str, str]]) -> str:
     return ""
 
 
+def _store_item(path: Path, item: Dict[str, Any]) -> None:
+    client = _supabase_client()
+    if client is not None:
+        table = _supabase_table()
+        client.table(table).insert(item).execute()
+        local = replica.replica()
+        if local is not None:
+            local.upsert([item])
+    else:
+        line = json.dumps(item, ensure_ascii=True) + "\n"
+        with file_lock(path):
+            segments.rotate_locked(path)
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write(line)
+    hot_cache.push(item, shared_cache().bump(_GENERATION))
+
+
 def append_conversation(messages: List[Dict[str, str]], response_text: str) -> Dict[str, Any]:
     path = ensure_archive_dir()
     convo_messages = [*messages, {"role": "assistant", "content": response_text}]
@@ -55,87 +68,226 @@ def append_conversation(messages: List[Dict[str, str]], response_text: str) -> D
         "messages": convo_messages,
         "preview": _preview(convo_messages),
     }
-    client = _supabase_client()
-    if client is not None:
-        table = _supabase_table()
-        client.table(table).insert(item).execute()
-        return item
-    with path.open("a", encoding="utf-8") as handle:
-        handle.write(json.dumps(item, ensure_ascii=True) + "\n")
+    _store_item(path, item)
     return item
 
 
 def append_dialogue(
     messages: List[Dict[str, Any]],
     metadata: Dict[str, Any] | None = None,
+    entry_id: str | None = None,
 ) -> Dict[str, Any]:
     path = ensure_archive_dir()
     item = {
-        "id": str(uuid.uuid4()),
+        "id": entry_id or str(uuid.uuid4()),
         "created_at": datetime.now(timezone.utc).isoformat(),
         "messages": messages,
         "preview": _preview(messages),
     }
     if metadata:
         item["metadata"] = metadata
+    _store_item(path, item)
+    return item
+
+
+def read_archive(
+    limit: int | None = None,
+    search: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+) -> List[Dict[str, Any]]:
+    if not since and not until:
+        items = _read_hot(limit, search)
+        if items is not None:
+            return items
+    ttl = settings.archive_cache_ttl
+    if ttl <= 0:
+        return _read_archive(limit, search, since, until)
+    cache = shared_cache()
+    key = f"{_GENERATION}:{cache.generation(_GENERATION)}:{limit}:{search}:{since}:{until}"
+    items = cache.get(key)
+    if items is None:
+        items = _read_archive(limit, search, since, until)
+        cache.set(key, items, ttl)
+    return items
+
+
+def _current_generation() -> int:
+    return shared_cache().generation(_GENERATION)
+
+
+def _refresh_replica(client: Any, table: str, force: bool = False) -> bool:
+    """
+    replica.refresh, bumping the archive generation when rows written
+    elsewhere arrive so every worker's hot ring refills.
+    """
+    local = replica.replica()
+    before = local.revision() if local is not None else None
+    fresh = replica.refresh(client, table, force=force)
+    if local is not None and local.revision() != before:
+        shared_cache().bump(_GENERATION)
+    return fresh
+
+
+def warm_hot_cache() -> int:
+    """
+    Load the newest HOT_CACHE_SIZE entries into this process's ring.
+    """
+    if settings.hot_cache_size <= 0:
+        return 0
+    generation = _current_generation()
     client = _supabase_client()
     if client is not None:
-        table = _supabase_table()
-        client.table(table).insert(item).execute()
-        return item
-    with path.open("a", encoding="utf-8") as handle:
-        handle.write(json.dumps(item, ensure_ascii=True) + "\n")
-    return item
+        local = replica.replica()
+        if local is None or not _refresh_replica(client, _supabase_table()):
+            return 0
+        items = local.latest(settings.hot_cache_size)
+    else:
+        items = segments.latest_items(ensure_archive_dir(), settings.hot_cache_size)
+    hot_cache.fill(items, generation)
+    return len(items)
+
+
+def _read_hot(limit: int | None, search: str | None) -> List[Dict[str, Any]] | None:
+    """
+    Serve from the ring when it can answer exactly what storage would;
+    None sends the caller to storage.
+    """
+    if settings.hot_cache_size <= 0:
+        return None
+    if not hot_cache.ready(_current_generation) and not warm_hot_cache():
+        return None
+    if limit is not None and limit < 0:
+        limit = None
+    if _supabase_client() is not None:
+        # Supabase filters before limiting (oldest first), so only a ring
+        # holding the whole table can answer.
+        if not hot_cache.complete:
+            return None
+        items = hot_cache.latest(None)
+        if search:
+            needle = search.lower()
+            items = [item for item in items if needle in str(item.get("preview", "")).lower()]
+        return items[:limit] if limit is not None else items
+    if not hot_cache.complete and (limit is None or limit > len(hot_cache)):
+        return None
+    items = hot_cache.latest(limit)
+    if search:
+        needle = search.lower()
+        items = [item for item in items if needle in str(item.get("preview", "")).lower()]
+    return items
+
+
+def latest_entries(count: int) -> List[Dict[str, Any]]:
+    """
+    The newest ``count`` entries, oldest first, on either backend. Unlike
+    ``read_archive(limit=...)`` this never falls back to the oldest rows.
+    """
+    if count <= 0:
+        return []
+    if settings.hot_cache_size > 0 and hot_cache.ready(_current_generation) and len(hot_cache) >= count:
+        return hot_cache.latest(count)
+    client = _supabase_client()
+    if client is None:
+        return segments.latest_items(ensure_archive_dir(), count)
+    table = _supabase_table()
+    if _refresh_replica(client, table):
+        return replica.replica().latest(count)
+    response = client.table(table).select("*").order("created_at", desc=True).limit(count).execute()
+    return list(reversed(response.data or []))
+
 
+def _in_range(item: Dict[str, Any], since: str | None, until: str | None) -> bool:
+    created_at = str(item.get("created_at", ""))
+    if since and created_at < since:
+        return False
+    if until and created_at > until:
+        return False
+    return True
 
-def read_archive(limit: int | None = None, search: str | None = None) -> List[Dict[str, Any]]:
+
+def _read_archive(
+    limit: int | None,
+    search: str | None,
+    since: str | None,
+    until: str | None,
+) -> List[Dict[str, Any]]:
     client = _supabase_client()
     if client is not None:
         table = _supabase_table()
+        if _refresh_replica(client, table):
+            return replica.replica().read(limit, search, since, until)
         query = client.table(table).select("*").order("created_at", desc=False)
         if search:
             query = query.ilike("preview", f"%{search}%")
+        if since:
+            query = query.gte("created_at", since)
+        if until:
+            query = query.lte("created_at", until)
         if limit is not None and limit >= 0:
             query = query.limit(limit)
         response = query.execute()
         return response.data or []
     path = ensure_archive_dir()
-    items: List[Dict[str, Any]] = []
-    with path.open("r", encoding="utf-8") as handle:
-        for line in handle:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                items.append(json.loads(line))
-            except json.JSONDecodeError:
-                continue
-    if limit is not None and limit >= 0:
-        items = items[-limit:]
+    if limit is not None and limit >= 0 and not since and not until:
+        items = segments.latest_items(path, limit)
+    else:
+        items = list(segments.iter_segment_items(path, since, until))
+        with path.open("r", encoding="utf-8") as handle:
+            items.extend(segments.iter_items(handle))
+        if since or until:
+            items = [item for item in items if _in_range(item, since, until)]
+        if limit is not None and limit >= 0:
+            items = items[-limit:]
     if search:
         needle = search.lower()
         items = [item for item in items if needle in str(item.get("preview", "")).lower()]
     return items
 
 
+def sync_replica() -> bool:
+    """
+    Pull new rows into the local Supabase replica (no-op for JSONL).
+    """
+    client = _supabase_client()
+    if client is None:
+        return False
+    return _refresh_replica(client, _supabase_table(), force=True)
+
+
+def maintain_archive() -> Dict[str, Any] | None:
+    """
+    Rotate, compact and apply retention to the local JSONL archive.
+    """
+    if _supabase_client() is not None:
+        return None
+    result = segments.maintain(ensure_archive_dir())
+    if result["removed"]:
+        shared_cache().bump(_GENERATION)
+    return result
+
+
 def get_archive_item(entry_id: str) -> Dict[str, Any] | None:
+    item = hot_cache.get(entry_id)
+    if item is not None:
+        return item
     client = _supabase_client()
     if client is not None:
         table = _supabase_table()
+        local = replica.replica()
+        if local is not None:
+            item = local.get(entry_id)
+            if item is not None:
+                return item
         response = client.table(table).select("*").eq("id", entry_id).execute()
         if response.data:
+            if local is not None:
+                local.upsert(response.data[:1])
             return response.data[0]
         return None
     path = ensure_archive_dir()
     with path.open("r", encoding="utf-8") as handle:
-        for line in handle:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                item = json.loads(line)
-            except json.JSONDecodeError:
-                continue
+        for item in segments.iter_items(handle):
             if item.get("id") == entry_id:
                 return item
-    return None
+    return segments.find_in_segments(path, entry_id)
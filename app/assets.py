@@ -0,0 +1,228 @@
+"""
+Fingerprinted, pre-compressed static assets.
+
+At startup every file in ``app/static`` is hashed and compressed once (gzip,
+plus brotli when ``brotli`` is installed). Scripts and stylesheets are
+published under content-hashed names (``app.3f9c1e2a7b.js``) with immutable
+cache headers, and the HTML pages are rewritten to reference those names.
+Pages themselves keep their plain URLs and are revalidated by ETag.
+
+``archive_pages`` fills the archive list into the page server-side, so the
+first paint needs one round trip. A rendered page is reused until the
+archive generation moves or it is older than ARCHIVE_CACHE_TTL; the TTL
+covers rows other instances write to Supabase, which never touch this
+process's generation.
+"""
+
+import gzip
+import hashlib
+import html
+import logging
+import mimetypes
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.responses import Response
+
+logger = logging.getLogger("bloomed-terminal.assets")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+_COMPRESSIBLE = (".html", ".js", ".css", ".svg", ".json", ".txt")
+_MIN_COMPRESS = 256
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class Asset:
+    __slots__ = ("name", "media_type", "etag", "variants", "immutable")
+
+    def __init__(self, name: str, body: bytes, immutable: bool):
+        self.name = name
+        self.media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if self.media_type.startswith("text/") or self.media_type.endswith("javascript"):
+            self.media_type += "; charset=utf-8"
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        self.immutable = immutable
+        self.variants = compress(body, name)
+
+
+def compress(body: bytes, name: str = ".html", fast: bool = False) -> Dict[str, bytes]:
+    """
+    Encoded variants of ``body``. Build-time assets get maximum compression;
+    ``fast`` trades a little size for speed on pages re-rendered at runtime.
+    """
+    variants = {"identity": body}
+    if not name.endswith(_COMPRESSIBLE) or len(body) < _MIN_COMPRESS:
+        return variants
+    variants["gzip"] = gzip.compress(body, compresslevel=6 if fast else 9, mtime=0)
+    brotli = _brotli()
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=5 if fast else 11)
+    return variants
+
+
+def negotiate(accept_encoding: str, available: Dict[str, bytes]) -> str:
+    """
+    Smallest variant the client accepts (``q=0`` excludes an encoding).
+    """
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(token.strip())
+    options = [enc for enc in available if enc == "identity" or enc in accepted or "*" in accepted]
+    return min(options, key=lambda enc: len(available[enc]))
+
+
+def respond(
+    variants: Dict[str, bytes],
+    etag: str,
+    media_type: str,
+    cache_control: str,
+    accept_encoding: str,
+    if_none_match: Optional[str],
+) -> Response:
+    headers = {"Cache-Control": cache_control, "ETag": etag, "Vary": "Accept-Encoding"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    encoding = negotiate(accept_encoding, variants)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(variants[encoding], media_type=media_type, headers=headers)
+
+
+class Manifest:
+    def __init__(self, static_dir: Path):
+        self.static_dir = static_dir
+        self.assets: Dict[str, Asset] = {}
+        # Plain name -> fingerprinted name.
+        self.names: Dict[str, str] = {}
+        self.pages: Dict[str, bytes] = {}
+        self.build()
+
+    def build(self) -> None:
+        files = sorted(p for p in self.static_dir.iterdir() if p.is_file())
+        for path in files:
+            if path.suffix == ".html":
+                continue
+            body = path.read_bytes()
+            digest = hashlib.sha256(body).hexdigest()[:10]
+            hashed = f"{path.stem}.{digest}{path.suffix}"
+            self.names[path.name] = hashed
+            self.assets[hashed] = Asset(hashed, body, immutable=True)
+            # The plain name keeps working for stale pages and external links.
+            self.assets[path.name] = Asset(path.name, body, immutable=False)
+        for path in files:
+            if path.suffix != ".html":
+                continue
+            text = path.read_text(encoding="utf-8")
+            for plain, hashed in self.names.items():
+                text = text.replace(f"/static/{plain}", f"/static/{hashed}")
+            body = text.encode("utf-8")
+            self.pages[path.name] = body
+            self.assets[path.name] = Asset(path.name, body, immutable=False)
+        logger.info(
+            "built %d static assets (brotli %s)",
+            len(self.names),
+            "on" if _brotli() is not None else "off",
+        )
+
+    def serve(self, name: str, accept_encoding: str, if_none_match: Optional[str]) -> Optional[Response]:
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+        return respond(
+            asset.variants,
+            asset.etag,
+            asset.media_type,
+            IMMUTABLE if asset.immutable else REVALIDATE,
+            accept_encoding,
+            if_none_match,
+        )
+
+
+def render_archive_items(items: List[Dict[str, Any]]) -> str:
+    """
+    Same markup as renderArchiveItem in app.js, newest first.
+    """
+    if not items:
+        return '<div class="log-entry">no archived conversations yet.</div>'
+    rows = []
+    for item in reversed(items):
+        created_at = item.get("created_at")
+        meta = f"Logged {created_at}" if created_at else "Logged"
+        preview = item.get("preview") or "No preview available."
+        rows.append(
+            f'<a class="log-entry archive-entry" href="/archive/{html.escape(str(item.get("id")), quote=True)}">'
+            f'<div class="meta">{html.escape(meta)}</div>'
+            f'<div class="preview">{html.escape(str(preview))}</div></a>'
+        )
+    return "".join(rows)
+
+
+_LIST_TAG = '<section id="archiveList" class="archive-log" data-mode="list"></section>'
+_STATUS_TAG = '<div class="status" id="status">loading archive...</div>'
+
+
+class ArchivePageCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cached: Dict[str, Tuple[Any, float, Dict[str, bytes], str]] = {}
+
+    def render(
+        self,
+        page: bytes,
+        name: str,
+        key: Any,
+        items_loader: Callable[[], List[Dict[str, Any]]],
+        ttl: float,
+    ) -> Tuple[Dict[str, bytes], str]:
+        """
+        Pre-compressed variants and ETag of ``page`` with the archive list
+        filled in; re-rendered when ``key`` (the archive generation) moves or
+        the render is older than ``ttl`` seconds.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cached.get(name)
+        if cached is not None and cached[0] == key and now - cached[1] < ttl:
+            return cached[2], cached[3]
+        items = items_loader()
+        text = page.decode("utf-8")
+        text = text.replace(
+            _LIST_TAG,
+            f'<section id="archiveList" class="archive-log" data-mode="list" data-rendered="{len(items)}">'
+            f"{render_archive_items(items)}</section>",
+        ).replace(_STATUS_TAG, f'<div class="status" id="status">Loaded {len(items)} sessions.</div>')
+        body = text.encode("utf-8")
+        variants = compress(body, fast=True)
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        with self._lock:
+            self._cached[name] = (key, now, variants, etag)
+        return variants, etag
+
+
+_MANIFEST: Optional[Manifest] = None
+_MANIFEST_LOCK = threading.Lock()
+
+
+def manifest(static_dir: Path) -> Manifest:
+    global _MANIFEST
+    if _MANIFEST is None:
+        with _MANIFEST_LOCK:
+            if _MANIFEST is None:
+                _MANIFEST = Manifest(static_dir)
+    return _MANIFEST
+
+
+archive_pages = ArchivePageCache()
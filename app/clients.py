@@ -0,0 +1,220 @@
+"""
+Process-wide client registry.
+
+Every upstream (Anthropic, OpenAI, Supabase, mem0) is built once per process and the
+HTTP-based ones sit on pooled, keep-alive transports, so connections are
+reused across inference, dialogue and archive calls.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .settings import settings
+
+logger = logging.getLogger("bloomed-terminal.clients")
+
+_LOCK = threading.RLock()
+_HTTP: Optional[httpx.Client] = None
+_SUPABASE_HTTP: Optional[httpx.Client] = None
+_ANTHROPIC_HTTP = None
+_ANTHROPIC = None
+_OPENAI = None
+_SUPABASE = None
+_MEM0 = None
+_MEM0_FAILED = False
+
+
+def _http2_available() -> bool:
+    if not settings.http2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP2=true but h2 is not installed; falling back to HTTP/1.1 pooling.")
+        return False
+    return True
+
+
+def _pool_options() -> Dict[str, Any]:
+    return {
+        "http2": _http2_available(),
+        "limits": httpx.Limits(
+            max_connections=settings.http_pool_size,
+            max_keepalive_connections=settings.http_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        "timeout": httpx.Timeout(settings.http_timeout, connect=10.0),
+    }
+
+
+def http_client() -> httpx.Client:
+    """
+    Shared pooled httpx transport for generic outbound calls. It never
+    carries credentials; upstream SDKs get pools of their own.
+    """
+    global _HTTP
+    if _HTTP is not None:
+        return _HTTP
+    with _LOCK:
+        if _HTTP is None:
+            _HTTP = httpx.Client(**_pool_options())
+    return _HTTP
+
+
+def supabase_http_client() -> httpx.Client:
+    """
+    Pooled transport dedicated to Supabase. Postgrest rewrites the client it
+    is given in place (base_url, apikey/Authorization headers), so it must
+    not be shared with anything else.
+    """
+    global _SUPABASE_HTTP
+    if _SUPABASE_HTTP is not None:
+        return _SUPABASE_HTTP
+    with _LOCK:
+        if _SUPABASE_HTTP is None:
+            _SUPABASE_HTTP = httpx.Client(**_pool_options())
+    return _SUPABASE_HTTP
+
+
+def anthropic_http_client():
+    """
+    Pooled transport for the Anthropic SDK. Built from the SDK's own httpx
+    subclass so its default headers/redirect handling are kept.
+    """
+    global _ANTHROPIC_HTTP
+    if _ANTHROPIC_HTTP is not None:
+        return _ANTHROPIC_HTTP
+    from anthropic import DefaultHttpxClient
+
+    with _LOCK:
+        if _ANTHROPIC_HTTP is None:
+            _ANTHROPIC_HTTP = DefaultHttpxClient(**_pool_options())
+    return _ANTHROPIC_HTTP
+
+
+def anthropic_client():
+    global _ANTHROPIC
+    if _ANTHROPIC is not None:
+        return _ANTHROPIC
+    if not settings.anthropic_api_key:
+        raise RuntimeError("ANTHROPIC_API_KEY is not set. Add it to your environment.")
+    from anthropic import Anthropic
+
+    with _LOCK:
+        if _ANTHROPIC is None:
+            logger.info("Initializing Anthropic client.")
+            _ANTHROPIC = Anthropic(api_key=settings.anthropic_api_key, http_client=anthropic_http_client())
+    return _ANTHROPIC
+
+
+def openai_client():
+    global _OPENAI
+    if _OPENAI is not None:
+        return _OPENAI
+    if not settings.openai_api_key:
+        raise RuntimeError("OPENAI_API_KEY is not set.")
+    from openai import DefaultHttpxClient, OpenAI
+
+    with _LOCK:
+        if _OPENAI is None:
+            _OPENAI = OpenAI(api_key=settings.openai_api_key, http_client=DefaultHttpxClient(**_pool_options()))
+    return _OPENAI
+
+
+def supabase_client():
+    global _SUPABASE
+    if _SUPABASE is not None:
+        return _SUPABASE
+    if not settings.supabase_url or not settings.supabase_service_role_key:
+        return None
+    from supabase import ClientOptions, create_client
+
+    with _LOCK:
+        if _SUPABASE is None:
+            options = ClientOptions(httpx_client=supabase_http_client())
+            _SUPABASE = create_client(
+                settings.supabase_url,
+                settings.supabase_service_role_key,
+                options=options,
+            )
+    return _SUPABASE
+
+
+def mem0_client():
+    """
+    mem0 builds its own LLM/embedder clients internally; we only make sure it
+    is constructed once per process (construction itself is expensive).
+    """
+    global _MEM0, _MEM0_FAILED
+    if _MEM0 is not None or _MEM0_FAILED:
+        return _MEM0
+    if not settings.mem0_enabled or not settings.mem0_api_key:
+        return None
+    os.environ.setdefault("HOME", "/tmp")
+    os.environ.setdefault("XDG_DATA_HOME", "/tmp")
+    try:
+        from mem0 import Memory
+    except Exception as exc:
+        logger.warning("mem0 import failed: %s", exc)
+        _MEM0_FAILED = True
+        return None
+    config = {
+        "llm": {
+            "provider": settings.mem0_llm_provider,
+            "config": {
+                "model": settings.mem0_llm_model,
+                "temperature": settings.mem0_llm_temperature,
+                "max_tokens": settings.mem0_llm_max_tokens,
+            },
+        },
+        "embedder": {
+            "provider": settings.mem0_embed_provider,
+            "config": {
+                "model": settings.mem0_embed_model,
+            },
+        },
+    }
+    with _LOCK:
+        if _MEM0 is None:
+            _MEM0 = Memory.from_config(config)
+    return _MEM0
+
+
+def _open_connection(client: Any, url: Optional[str]) -> None:
+    if not url:
+        return
+    try:
+        client.head(url)
+    except Exception as exc:
+        logger.warning("prewarm connection to %s failed: %s", url, exc)
+
+
+def warm() -> None:
+    """
+    Build every configured client and open a keep-alive connection to each
+    upstream so the first real request skips TCP/TLS setup.
+    """
+    if settings.anthropic_api_key:
+        _open_connection(anthropic_http_client(), str(anthropic_client().base_url))
+    if supabase_client() is not None:
+        _open_connection(supabase_http_client(), settings.supabase_url)
+    mem0_client()
+    logger.info("Clients prewarmed.")
+
+
+def close() -> None:
+    global _HTTP, _SUPABASE_HTTP, _ANTHROPIC_HTTP, _ANTHROPIC, _OPENAI, _SUPABASE
+    with _LOCK:
+        for pool in (_HTTP, _SUPABASE_HTTP, _ANTHROPIC_HTTP):
+            if pool is not None:
+                pool.close()
+        _HTTP = None
+        _SUPABASE_HTTP = None
+        _ANTHROPIC_HTTP = None
+        _ANTHROPIC = None
+        _OPENAI = None
+        _SUPABASE = None
@@ -0,0 +1,167 @@
+"""
+Repetition detector for long dialogues.
+
+Each turn is shingled into hashed character k-grams of its
+whitespace-normalised text. Within the running transcript turns are compared
+exactly (Jaccard over shingle sets; a dialogue has at most a few dozen turns).
+Turns from recent archive entries are kept only as 64-bit SimHashes, which
+are compact but noisy, so they only count as a match when they are
+near-duplicates (``DEGENERATION_ARCHIVE_THRESHOLD``).
+
+Archive signatures are cached per entry id (entries are immutable), so
+consecutive dialogues only hash entries they have not seen yet.
+
+A turn whose best match reaches its threshold is a strike;
+``DEGENERATION_PATIENCE`` consecutive strikes trip the detector.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .settings import settings
+
+_SPACE = re.compile(r"\s+")
+_BITS = 64
+_MASK = (1 << _BITS) - 1
+
+
+def shingles(text: str, k: int) -> FrozenSet[int]:
+    """
+    Hashed character k-grams. Uses the builtin hash, so values are only
+    comparable within one process (which is all the detector needs).
+    """
+    norm = _SPACE.sub(" ", text.lower()).strip()
+    if len(norm) <= k:
+        return frozenset([hash(norm)]) if norm else frozenset()
+    return frozenset(hash(norm[i:i + k]) for i in range(len(norm) - k + 1))
+
+
+def simhash(features: Iterable[int]) -> int:
+    weights = [0] * _BITS
+    for h in features:
+        h &= _MASK
+        for bit in range(_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def simhash_similarity(a: int, b: int) -> float:
+    return 1.0 - bin(a ^ b).count("1") / _BITS
+
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+_SIGNATURES: "OrderedDict[Tuple[str, int], List[Tuple[str, int]]]" = OrderedDict()
+_SIGNATURES_LOCK = threading.Lock()
+_SIGNATURES_MAX = 256
+
+
+def entry_signatures(entry: Dict[str, Any], k: int) -> List[Tuple[str, int]]:
+    """
+    (label, SimHash) for every turn of an archive entry, memoised by id.
+    """
+    key = (str(entry.get("id")), k)
+    with _SIGNATURES_LOCK:
+        cached = _SIGNATURES.get(key)
+        if cached is not None:
+            _SIGNATURES.move_to_end(key)
+            return cached
+    label = f"archive {entry.get('id')}"
+    signatures = [
+        (label, simhash(shingles(str(msg["content"]), k)))
+        for msg in entry.get("messages") or []
+        if msg.get("content")
+    ]
+    with _SIGNATURES_LOCK:
+        _SIGNATURES[key] = signatures
+        while len(_SIGNATURES) > _SIGNATURES_MAX:
+            _SIGNATURES.popitem(last=False)
+    return signatures
+
+
+@dataclass
+class Verdict:
+    reason: str
+    turn: int
+    similarity: float
+    matched: str
+
+    def as_metadata(self, action: str) -> Dict[str, Any]:
+        return {
+            "action": action,
+            "reason": self.reason,
+            "turn": self.turn,
+            "similarity": round(self.similarity, 3),
+            "matched": self.matched,
+        }
+
+
+class DegenerationDetector:
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        patience: Optional[int] = None,
+        min_turns: Optional[int] = None,
+        reference: Iterable[Tuple[str, int]] = (),
+    ):
+        self.threshold = settings.degeneration_threshold if threshold is None else threshold
+        self.archive_threshold = settings.degeneration_archive_threshold
+        self.patience = settings.degeneration_patience if patience is None else patience
+        self.min_turns = settings.degeneration_min_turns if min_turns is None else min_turns
+        self.k = settings.degeneration_shingle
+        self.reference = list(reference)
+        self.turns: List[FrozenSet[int]] = []
+        self.strikes = 0
+        self.events: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_archive(cls, entries: Iterable[Dict[str, Any]], **kwargs: Any) -> "DegenerationDetector":
+        k = settings.degeneration_shingle
+        reference = [sig for entry in entries for sig in entry_signatures(entry, k)]
+        return cls(reference=reference, **kwargs)
+
+    def reset(self) -> None:
+        self.strikes = 0
+
+    def _best_match(self, features: FrozenSet[int]) -> Tuple[bool, float, str]:
+        best, matched = 0.0, ""
+        for index, previous in enumerate(self.turns):
+            score = jaccard(features, previous)
+            if score > best:
+                best, matched = score, f"turn {index}"
+        if best >= self.threshold:
+            return True, best, matched
+        if self.reference:
+            signature = simhash(features)
+            for label, previous in self.reference:
+                score = simhash_similarity(signature, previous)
+                if score >= self.archive_threshold:
+                    return True, score, label
+        return False, best, matched
+
+    def observe(self, text: str) -> Optional[Verdict]:
+        """
+        Index one turn; return a Verdict once repetition has persisted.
+        """
+        features = shingles(text, self.k)
+        hit, score, matched = self._best_match(features)
+        self.turns.append(features)
+        if len(self.turns) <= self.min_turns or not hit:
+            self.strikes = 0
+            return None
+        self.strikes += 1
+        if self.strikes < self.patience:
+            return None
+        return Verdict("repetition", len(self.turns) - 1, score, matched)
@@ -1,12 +1,18 @@
 import asyncio
 import logging
-import os
-from typing import Any, Dict, List, Optional, Tuple
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
 
 from anthropic import Anthropic
 
+from . import clients, routing
 from .settings import settings
-from .archive import append_dialogue
+from .archive import append_dialogue, latest_entries
+from .degeneration import DegenerationDetector
+from .live import hub
+from .personalities import estimate_tokens, random_seed
+from .shared import single_flight
 
 logger = logging.getLogger("bloomed-terminal.dialogue")
 
@@ -42,56 +48,18 @@ truth
 simulator@void:~/$
 """
 
-_ANTHROPIC_CLIENT: Optional[Anthropic] = None
-_MEM0_CLIENT = None
-
-
 def clamp_exchanges(value: Any) -> int:
     if not isinstance(value, (int, float)) or not value == value:
         return 6
     return max(1, min(int(value), 40))
 
 
-def _ensure_clients() -> Anthropic:
-    global _ANTHROPIC_CLIENT
-    if _ANTHROPIC_CLIENT is None:
-        if not settings.anthropic_api_key:
-            raise RuntimeError("ANTHROPIC_API_KEY is not set.")
-        _ANTHROPIC_CLIENT = Anthropic(api_key=settings.anthropic_api_key)
-    return _ANTHROPIC_CLIENT
+def _ensure_clients() -> routing.RoutedClient:
+    return routing.routed_client()
 
 
 def _mem0_client():
-    global _MEM0_CLIENT
-    if _MEM0_CLIENT is not None:
-        return _MEM0_CLIENT
-    if not settings.mem0_enabled or not settings.mem0_api_key:
-        return None
-    os.environ.setdefault("HOME", "/tmp")
-    os.environ.setdefault("XDG_DATA_HOME", "/tmp")
-    try:
-        from mem0 import Memory
-    except Exception as exc:
-        logger.warning("mem0 import failed: %s", exc)
-        return None
-    config = {
-        "llm": {
-            "provider": settings.mem0_llm_provider,
-            "config": {
-                "model": settings.mem0_llm_model,
-                "temperature": settings.mem0_llm_temperature,
-                "max_tokens": settings.mem0_llm_max_tokens,
-            },
-        },
-        "embedder": {
-            "provider": settings.mem0_embed_provider,
-            "config": {
-                "model": settings.mem0_embed_model,
-            },
-        },
-    }
-    _MEM0_CLIENT = Memory.from_config(config)
-    return _MEM0_CLIENT
+    return clients.mem0_client()
 
 
 def _mem0_context(query: str) -> str:
@@ -121,26 +89,104 @@ def _mem0_context(query: str) -> str:
     return "\n".join(lines).strip()
 
 
+class TokenBudget:
+    """
+    Per-seat max_tokens sized from the speaker's recent output lengths
+    (largest of the last few turns times DIALOGUE_TOKEN_HEADROOM), clamped to
+    [DIALOGUE_MIN_TOKENS, DIALOGUE_TOKEN_CEILING]. Speakers with no history
+    get DIALOGUE_MAX_TOKENS. Undershooting only costs a continuation call.
+    """
+
+    def __init__(self, window: int = 6):
+        self.window = window
+        self._observed: Dict[str, Deque[int]] = {}
+
+    def for_speaker(self, speaker: str) -> int:
+        observed = self._observed.get(speaker)
+        if not observed:
+            return settings.dialogue_max_tokens
+        wanted = int(max(observed) * settings.dialogue_token_headroom)
+        return max(settings.dialogue_min_tokens, min(wanted, settings.dialogue_token_ceiling))
+
+    def observe(self, speaker: str, output_tokens: int) -> None:
+        self._observed.setdefault(speaker, deque(maxlen=self.window)).append(output_tokens)
+
+
+def _response_text(response: Any) -> str:
+    return "".join(
+        block.text for block in response.content or [] if getattr(block, "type", "text") == "text"
+    )
+
+
 def chat_with_model(
     *,
     model: str,
     messages: List[Dict[str, str]],
     anthropic_client: Anthropic,
     memory_context: str = "",
+    on_text: Optional[Callable[[str], None]] = None,
+    max_tokens: Optional[int] = None,
+    stats: Optional[Dict[str, Any]] = None,
 ) -> str:
+    """
+    One dialogue turn. When the reply stops on ``max_tokens`` it is continued
+    (the partial reply is sent back as an assistant prefill) up to
+    DIALOGUE_MAX_CONTINUATIONS times. ``stats``, when given, is filled with
+    token usage, continuation count, the final stop_reason and the ``route``
+    (``provider:model``) that served the reply, which can differ from
+    ``model`` after a failover or hedge.
+    """
     normalized = model.strip().lower()
     if not normalized.startswith("claude"):
         raise ValueError(f"Unsupported model: {model}")
     system_text = SYSTEM_PROMPT
     if memory_context:
         system_text = f"{SYSTEM_PROMPT}\n\nMemory context:\n{memory_context}"
-    response = anthropic_client.messages.create(
-        model=normalized,
-        system=system_text,
-        max_tokens=1024,
-        messages=messages,
-    )
-    return response.content[0].text if response.content else ""
+    budget = int(max_tokens or settings.dialogue_max_tokens)
+    text = ""
+    trailing = ""
+    usage = {"input_tokens": 0, "output_tokens": 0, "continuations": 0, "max_tokens": budget}
+    while True:
+        prompt = messages
+        if text:
+            # The API rejects prefills ending in whitespace. It is held back and
+            # restored unless the continuation re-emits it, so line breaks and
+            # alignment in ASCII art survive the boundary.
+            stripped = text.rstrip()
+            trailing, text = text[len(stripped):], stripped
+            prompt = [*messages, {"role": "assistant", "content": text}]
+        req = {
+            "model": normalized,
+            "system": system_text,
+            "max_tokens": budget,
+            "messages": prompt,
+        }
+        if on_text is not None:
+            manager = anthropic_client.messages.stream(**req)
+            with manager as stream:
+                for chunk in stream.text_stream:
+                    on_text(chunk)
+                response = stream.get_final_message()
+            route = getattr(manager, "route", None)
+        else:
+            response = anthropic_client.messages.create(**req)
+            route = getattr(response, "route", None)
+        usage["route"] = route or f"anthropic:{normalized}"
+        part = _response_text(response)
+        if trailing and not part[:1].isspace():
+            text += trailing
+        trailing = ""
+        text += part
+        reported = getattr(response, "usage", None)
+        usage["input_tokens"] += getattr(reported, "input_tokens", 0) or 0
+        usage["output_tokens"] += getattr(reported, "output_tokens", 0) or estimate_tokens(part)
+        usage["stop_reason"] = getattr(response, "stop_reason", None)
+        if usage["stop_reason"] != "max_tokens" or usage["continuations"] >= settings.dialogue_max_continuations:
+            break
+        usage["continuations"] += 1
+    if stats is not None:
+        stats.update(usage)
+    return text
 
 
 def build_conversations() -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
@@ -165,34 +211,87 @@ def run_dialogue(
     model1: str,
     model2: str,
     anthropic_client: Anthropic,
+    publish: Optional[Callable[[Dict[str, Any]], None]] = None,
+    detector: Optional[DegenerationDetector] = None,
 ) -> List[Dict[str, str]]:
+    """
+    ``publish``, when given, receives a "turn" event after every response and,
+    with LIVE_STREAM_TOKENS, "token" events while a response is generated.
+
+    ``detector``, when given, sees every turn; on repetition the dialogue is
+    re-seeded (DEGENERATION_ACTION=reseed, up to DEGENERATION_MAX_RESEEDS) or
+    stopped early. Each intervention is appended to ``detector.events``.
+    """
     conversation1, conversation2 = build_conversations()
     transcript: List[Dict[str, str]] = []
     model1 = _normalize_model(model1, fallback=settings.model_1)
     model2 = _normalize_model(model2, fallback=settings.model_2)
 
-    for _ in range(num_exchanges):
-        memory_context = _mem0_context(conversation1[-1]["content"] if conversation1 else "enlightenment")
-        response1 = chat_with_model(
-            model=model1,
-            messages=conversation1,
+    def on_text_for(speaker: str) -> Optional[Callable[[str], None]]:
+        if publish is None or not settings.live_stream_tokens:
+            return None
+        index = len(transcript)
+        return lambda text: publish({"type": "token", "index": index, "speaker": speaker, "text": text})
+
+    budget = TokenBudget()
+
+    def turn(slot: str, model: str, conversation: List[Dict[str, str]]) -> str:
+        # Budgets are tracked per seat, since both seats often run the same model.
+        usage: Dict[str, Any] = {}
+        text = chat_with_model(
+            model=model,
+            messages=conversation,
             anthropic_client=anthropic_client,
-            memory_context=memory_context,
+            memory_context=_mem0_context(conversation[-1]["content"] if conversation else "enlightenment"),
+            on_text=on_text_for(model),
+            max_tokens=budget.for_speaker(slot),
+            stats=usage,
         )
-        transcript.append({"speaker": model1, "text": response1})
+        budget.observe(slot, usage["output_tokens"])
+        # The speaker is the model that actually answered, not the one asked for.
+        record(usage["route"].partition(":")[2], text, usage)
+        return text
+
+    def record(speaker: str, text: str, usage: Dict[str, Any]) -> None:
+        transcript.append({"speaker": speaker, "text": text, "usage": usage})
+        if publish is not None:
+            publish({"type": "turn", "index": len(transcript) - 1, "speaker": speaker, "text": text})
+
+    reseeds = 0
+
+    def degenerated(text: str, next_prompt: List[Dict[str, str]]) -> bool:
+        nonlocal reseeds
+        if detector is None:
+            return False
+        verdict = detector.observe(text)
+        if verdict is None:
+            return False
+        if settings.degeneration_action == "reseed" and reseeds < settings.degeneration_max_reseeds:
+            reseeds += 1
+            detector.events.append(verdict.as_metadata("reseeded"))
+            detector.reset()
+            # Only the prompt the next speaker sees is nudged; the transcript stays verbatim.
+            next_prompt[-1]["content"] += (
+                f"\n\n[operator] The dialogue is looping. New seed: {random_seed()}. "
+                "Take it somewhere neither of you has been."
+            )
+            return False
+        detector.events.append(verdict.as_metadata("stopped"))
+        logger.info("dialogue stopped early at turn %d (similarity %.2f)", verdict.turn, verdict.similarity)
+        return True
+
+    for _ in range(num_exchanges):
+        response1 = turn("ai1", model1, conversation1)
         conversation1.append({"role": "assistant", "content": response1})
         conversation2.append({"role": "user", "content": response1})
+        if degenerated(response1, conversation2):
+            break
 
-        memory_context = _mem0_context(conversation2[-1]["content"] if conversation2 else "enlightenment")
-        response2 = chat_with_model(
-            model=model2,
-            messages=conversation2,
-            anthropic_client=anthropic_client,
-            memory_context=memory_context,
-        )
-        transcript.append({"speaker": model2, "text": response2})
+        response2 = turn("ai2", model2, conversation2)
         conversation1.append({"role": "user", "content": response2})
         conversation2.append({"role": "assistant", "content": response2})
+        if degenerated(response2, conversation1):
+            break
 
     return transcript
 
@@ -228,23 +327,69 @@ def generate_archive_entry() -> Optional[Dict[str, Any]]:
     num_exchanges = clamp_exchanges(settings.dialogue_exchanges)
     model1 = settings.model_1
     model2 = settings.model_2
-
-    transcript = run_dialogue(
-        num_exchanges=num_exchanges,
-        model1=model1,
-        model2=model2,
-        anthropic_client=anthropic_client,
-    )
-    _persist_mem0(transcript)
-    messages = _transcript_to_messages(transcript)
-    return append_dialogue(
-        messages,
-        metadata={
+    # The live session id doubles as the entry id, so /archive/{id} can tail
+    # the dialogue while it runs and load the stored entry once it is done.
+    entry_id = str(uuid.uuid4())
+    hub.start(entry_id, model_1=model1, model_2=model2, num_exchanges=num_exchanges)
+    try:
+        detector = _degeneration_detector()
+        transcript = run_dialogue(
+            num_exchanges=num_exchanges,
+            model1=model1,
+            model2=model2,
+            anthropic_client=anthropic_client,
+            publish=lambda event: hub.publish(entry_id, event),
+            detector=detector,
+        )
+        _persist_mem0(transcript)
+        messages = _transcript_to_messages(transcript)
+        metadata: Dict[str, Any] = {
             "model_1": model1,
             "model_2": model2,
             "num_exchanges": num_exchanges,
-        },
-    )
+        }
+        metadata["usage"] = _usage_summary(transcript)
+        if detector is not None and detector.events:
+            metadata["degeneration"] = detector.events
+            metadata["turns_completed"] = len(transcript)
+        entry = append_dialogue(messages, metadata=metadata, entry_id=entry_id)
+    except Exception as exc:
+        hub.finish(entry_id, error=str(exc))
+        raise
+    hub.finish(entry_id, entry_id=entry_id)
+    return entry
+
+
+def _usage_summary(transcript: List[Dict[str, Any]]) -> Dict[str, Any]:
+    turns = [entry.get("usage") or {} for entry in transcript]
+    return {
+        "input_tokens": sum(t.get("input_tokens", 0) for t in turns),
+        "output_tokens": sum(t.get("output_tokens", 0) for t in turns),
+        "continuations": sum(t.get("continuations", 0) for t in turns),
+        "truncated_turns": sum(1 for t in turns if t.get("stop_reason") == "max_tokens"),
+        "turns": [
+            {
+                "speaker": entry.get("speaker"),
+                "max_tokens": t.get("max_tokens"),
+                "output_tokens": t.get("output_tokens"),
+                "continuations": t.get("continuations", 0),
+                "route": t.get("route"),
+            }
+            for entry, t in zip(transcript, turns)
+        ],
+    }
+
+
+def _degeneration_detector() -> Optional[DegenerationDetector]:
+    if settings.degeneration_action not in ("stop", "reseed"):
+        return None
+    recent: List[Dict[str, Any]] = []
+    if settings.degeneration_archive_window > 0:
+        try:
+            recent = latest_entries(settings.degeneration_archive_window)
+        except Exception as exc:
+            logger.warning("degeneration reference load failed: %s", exc)
+    return DegenerationDetector.from_archive(recent)
 
 
 def _persist_mem0(transcript: List[Dict[str, str]]) -> None:
@@ -272,7 +417,8 @@ async def run_archive_loop() -> None:
     interval = max(1, int(settings.dialogue_interval_minutes)) * 60
     while True:
         try:
-            entry = await asyncio.to_thread(generate_archive_entry)
+            with single_flight("archive-generation") as acquired:
+                entry = await asyncio.to_thread(generate_archive_entry) if acquired else None
             if entry:
                 logger.info("archive entry created: %s", entry.get("id"))
         except Exception as exc:
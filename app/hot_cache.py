@@ -0,0 +1,128 @@
+"""
+In-process ring buffer of the most recent archive entries.
+
+Entries are held as compact headers (``__slots__``: id, created_at, preview)
+plus the entry's encoded JSON; the full dict is only decoded when a caller
+asks for it. The ring is bounded by HOT_CACHE_SIZE entries and
+HOT_CACHE_MAX_BYTES of encoded JSON, filled at startup and on every append.
+
+Other workers (and replica syncs) signal new data through the shared
+archive generation counter; the ring compares it at most once per
+HOT_CACHE_CHECK_INTERVAL and refills when it has moved, so hot reads are
+otherwise served without touching storage.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .settings import settings
+
+
+class HotEntry:
+    __slots__ = ("id", "created_at", "preview", "raw")
+
+    def __init__(self, item: Dict[str, Any]):
+        self.id = str(item.get("id"))
+        self.created_at = str(item.get("created_at", ""))
+        self.preview = str(item.get("preview", ""))
+        self.raw = json.dumps(item, ensure_ascii=True).encode("ascii")
+
+    def item(self) -> Dict[str, Any]:
+        return json.loads(self.raw)
+
+
+class HotCache:
+    def __init__(self, size: int, max_bytes: int, check_interval: float):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self._entries: Deque[HotEntry] = deque()
+        self._by_id: Dict[str, HotEntry] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._warm = False
+        # True when the ring holds the entire archive (the last fill came up short).
+        self.complete = False
+        self.generation = -1
+        self._checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _push(self, entry: HotEntry) -> None:
+        old = self._by_id.pop(entry.id, None)
+        if old is not None:
+            self._entries.remove(old)
+            self._bytes -= len(old.raw)
+        self._entries.append(entry)
+        self._by_id[entry.id] = entry
+        self._bytes += len(entry.raw)
+        while self._entries and (len(self._entries) > self.size or self._bytes > self.max_bytes):
+            dropped = self._entries.popleft()
+            del self._by_id[dropped.id]
+            self._bytes -= len(dropped.raw)
+            self.complete = False
+
+    def fill(self, items: List[Dict[str, Any]], generation: int) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_id.clear()
+            self._bytes = 0
+            self.complete = True
+            for item in items[-self.size:]:
+                self._push(HotEntry(item))
+            self.complete = self.complete and len(items) < self.size
+            self.generation = generation
+            self._checked_at = time.monotonic()
+            self._warm = True
+
+    def push(self, item: Dict[str, Any], generation: int) -> None:
+        """
+        Record our own append. ``generation`` is the shared counter after our
+        bump; if anything else moved it too, the ring is marked stale.
+        """
+        with self._lock:
+            if not self._warm:
+                return
+            self._push(HotEntry(item))
+            if generation == self.generation + 1:
+                self.generation = generation
+            else:
+                self._warm = False
+
+    def ready(self, current_generation: Callable[[], int]) -> bool:
+        with self._lock:
+            if not self._warm:
+                return False
+            now = time.monotonic()
+            if now - self._checked_at < self.check_interval:
+                return True
+            self._checked_at = now
+            if current_generation() != self.generation:
+                self._warm = False
+            return self._warm
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._warm = False
+
+    def latest(self, limit: Optional[int]) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._entries)
+        if limit is not None:
+            entries = entries[-limit:] if limit else []
+        return [entry.item() for entry in entries]
+
+    def get(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._by_id.get(entry_id)
+        return entry.item() if entry is not None else None
+
+
+hot_cache = HotCache(
+    size=settings.hot_cache_size,
+    max_bytes=settings.hot_cache_max_bytes,
+    check_interval=settings.hot_cache_check_interval,
+)
@@ -1,28 +1,26 @@
 import logging
 from typing import List, Optional, Dict, Tuple
 
-from anthropic import Anthropic
-
+from . import routing
 from .settings import settings
-from .personalities import default_persona_system
+from .personalities import DEFAULT_PERSONA_SYSTEM
 
 logger = logging.getLogger("bloomed-terminal.inference")
 logging.basicConfig(level=logging.INFO)
 
 _CLIENT = None
+# Built once: the injected house-voice system message is shared by every request.
+_DEFAULT_SYSTEM_MESSAGE = {"role": "system", "content": DEFAULT_PERSONA_SYSTEM.strip()}
 
 def load_model(model_dir: Optional[str] = None) -> None:
     """
-    Lazy-load Anthropic client into module globals.
+    Lazy-load the routed Anthropic client into module globals.
     """
     del model_dir
     global _CLIENT
     if _CLIENT is not None:
         return
-    if not settings.anthropic_api_key:
-        raise RuntimeError("ANTHROPIC_API_KEY is not set. Add it to your environment.")
-    logger.info("Initializing Anthropic client.")
-    _CLIENT = Anthropic(api_key=settings.anthropic_api_key)
+    _CLIENT = routing.routed_client()
     logger.info("Anthropic client ready.")
 
 def _ensure_persona_system(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
@@ -31,8 +29,7 @@ def _ensure_persona_system(messages: List[Dict[str, str]]) -> List[Dict[str, str
     """
     if messages and messages[0].get("role") == "system":
         return messages
-    sys = default_persona_system()
-    return [{"role": "system", "content": sys}, *messages]
+    return [_DEFAULT_SYSTEM_MESSAGE, *messages]
 
 def _split_system(messages: List[Dict[str, str]]) -> Tuple[str, List[Dict[str, str]]]:
     system_parts: List[str] = []
@@ -44,7 +41,10 @@ def _split_system(messages: List[Dict[str, str]]) -> Tuple[str, List[Dict[str, s
             if content:
                 system_parts.append(content)
         elif role in ("user", "assistant"):
-            filtered.append({"role": role, "content": content})
+            # Messages that already carry only role/content are passed through as-is.
+            filtered.append(msg if len(msg) == 2 and "content" in msg else {"role": role, "content": content})
+    if len(system_parts) == 1:
+        return system_parts[0].strip(), filtered
     return "\n\n".join(system_parts).strip(), filtered
 
 def generate(
@@ -0,0 +1,332 @@
+"""
+Live-tail pub/sub for in-progress dialogues.
+
+The dialogue runs in a worker thread and publishes turn (and optionally
+token) events into a session. Each viewer owns a bounded asyncio queue on
+the server loop; publishing hands events over with ``call_soon_threadsafe``
+and drops the oldest queued event when a viewer falls behind, so a slow
+client never stalls generation.
+
+Every event is also written to ``LiveStore``, a SQLite file under
+``settings.state_dir``. With several workers a viewer usually lands on one
+that is not running the dialogue; it replays the session from the store and
+then polls it every LIVE_POLL_INTERVAL seconds.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from .settings import settings
+from .shared import state_dir
+
+logger = logging.getLogger("bloomed-terminal.live")
+
+_HISTORY_EVENTS = ("start", "turn", "done")
+# Unfinished sessions with no event for this long belong to a worker that died.
+_ABANDONED = 3600.0
+
+
+class LiveStore:
+    """
+    Session events shared by every worker through one SQLite file.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or state_dir() / "live.sqlite3"
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, started_at REAL, touched_at REAL, finished_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, session TEXT, type TEXT, body TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS events_session ON events (session, seq)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start(self, session_id: str, started_at: float) -> None:
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM events WHERE session = ?", (session_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, NULL)",
+                (session_id, started_at, started_at),
+            )
+            conn.execute("COMMIT")
+
+    def append(self, session_id: str, event: Dict[str, Any]) -> None:
+        now = time.time()
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "INSERT INTO events (session, type, body) VALUES (?, ?, ?)",
+                (session_id, event.get("type"), json.dumps(event, ensure_ascii=True)),
+            )
+            if event.get("type") == "done":
+                conn.execute(
+                    "UPDATE sessions SET touched_at = ?, finished_at = ? WHERE id = ?", (now, now, session_id)
+                )
+            else:
+                conn.execute("UPDATE sessions SET touched_at = ? WHERE id = ?", (now, session_id))
+            conn.execute("COMMIT")
+
+    def exists(self, session_id: str) -> bool:
+        with contextlib.closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone() is not None
+
+    def history(self, session_id: str) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Turn-level events so far, and the sequence number to poll after.
+        """
+        placeholders = ", ".join("?" for _ in _HISTORY_EVENTS)
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            last = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events WHERE session = ?", (session_id,)).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT body FROM events WHERE session = ? AND seq <= ? AND type IN ({placeholders}) ORDER BY seq",
+                (session_id, last, *_HISTORY_EVENTS),
+            ).fetchall()
+            conn.execute("COMMIT")
+        return [json.loads(row[0]) for row in rows], last
+
+    def since(self, session_id: str, seq: int, limit: int = 500) -> List[Tuple[int, Dict[str, Any]]]:
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT seq, body FROM events WHERE session = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (session_id, seq, limit),
+            ).fetchall()
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT s.id, s.started_at, s.finished_at, "
+                "(SELECT COUNT(*) FROM events e WHERE e.session = s.id AND e.type = 'turn') "
+                "FROM sessions s ORDER BY s.started_at"
+            ).fetchall()
+        return [
+            {"id": sid, "started_at": started_at, "turns": turns, "done": finished_at is not None}
+            for sid, started_at, finished_at, turns in rows
+        ]
+
+    def evict(self, linger: float) -> None:
+        now = time.time()
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "DELETE FROM sessions WHERE finished_at < ? OR (finished_at IS NULL AND touched_at < ?)",
+                (now - linger, now - _ABANDONED),
+            )
+            conn.execute("DELETE FROM events WHERE session NOT IN (SELECT id FROM sessions)")
+            conn.execute("COMMIT")
+
+
+_STORE: Optional[LiveStore] = None
+
+
+def live_store() -> LiveStore:
+    global _STORE
+    if _STORE is None:
+        _STORE = LiveStore()
+    return _STORE
+
+
+class Subscriber:
+    __slots__ = ("loop", "queue", "dropped")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, size: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.dropped = 0
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        # Runs on the subscriber's loop.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Dict[str, Any]:
+        return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+
+
+class SharedTail:
+    """
+    Viewer of a session run by another worker: the replayed history, then
+    whatever the store gains, polled every LIVE_POLL_INTERVAL seconds.
+    """
+
+    def __init__(self, store: LiveStore, session_id: str, history: List[Dict[str, Any]], after: int):
+        self.store = store
+        self.session_id = session_id
+        self.after = after
+        self._buffer: Deque[Dict[str, Any]] = deque(history)
+
+    async def get(self, timeout: float) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self._buffer:
+            rows = await asyncio.to_thread(self.store.since, self.session_id, self.after)
+            if rows:
+                self.after = rows[-1][0]
+                self._buffer.extend(event for _, event in rows)
+                break
+            if loop.time() >= deadline:
+                if not await asyncio.to_thread(self.store.exists, self.session_id):
+                    # Evicted without a "done": the owning worker went away.
+                    return {"type": "done", "error": "session lost"}
+                raise asyncio.TimeoutError
+            await asyncio.sleep(settings.live_poll_interval)
+        return self._buffer.popleft()
+
+
+class Session:
+    __slots__ = ("id", "started_at", "finished_at", "history", "subscribers")
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.started_at = time.time()
+        self.history: List[Dict[str, Any]] = []
+        self.subscribers: List[Subscriber] = []
+        self.finished_at: Optional[float] = None
+
+
+class LiveHub:
+    def __init__(self, buffer_size: int = 256, linger: float = 60.0, store: Optional[LiveStore] = None):
+        self.buffer_size = buffer_size
+        self.linger = linger
+        self._store = store
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Session] = {}
+
+    def _shared(self) -> LiveStore:
+        return self._store if self._store is not None else live_store()
+
+    def start(self, session_id: str, **meta: Any) -> None:
+        session = Session(session_id)
+        with self._lock:
+            self._evict()
+            self._sessions[session_id] = session
+        try:
+            store = self._shared()
+            store.evict(self.linger)
+            store.start(session_id, session.started_at)
+        except sqlite3.Error as exc:
+            logger.warning("live store unavailable; session %s is local only: %s", session_id, exc)
+        self.publish(session_id, {"type": "start", **meta})
+
+    def publish(self, session_id: str, event: Dict[str, Any]) -> None:
+        """
+        Thread-safe and non-blocking. Turn-level events are kept for replay
+        to late joiners; token events are only forwarded.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            if event.get("type") in _HISTORY_EVENTS:
+                session.history.append(event)
+            if event.get("type") == "done":
+                session.finished_at = time.time()
+            subscribers = list(session.subscribers)
+        try:
+            self._shared().append(session_id, event)
+        except sqlite3.Error as exc:
+            logger.warning("live store append failed for %s: %s", session_id, exc)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                pass  # subscriber's loop already closed
+
+    def finish(self, session_id: str, **meta: Any) -> None:
+        self.publish(session_id, {"type": "done", **meta})
+
+    async def open(self, session_id: str) -> Optional[Union[Subscriber, SharedTail]]:
+        """
+        A viewer for ``session_id``: in-process when this worker runs the
+        session, otherwise a poller over the shared store.
+        """
+        sub = self.subscribe(session_id)
+        if sub is not None:
+            return sub
+        store = self._shared()
+        try:
+            if not await asyncio.to_thread(store.exists, session_id):
+                return None
+            history, after = await asyncio.to_thread(store.history, session_id)
+        except sqlite3.Error as exc:
+            logger.warning("live store read failed for %s: %s", session_id, exc)
+            return None
+        return SharedTail(store, session_id, history, after)
+
+    def subscribe(self, session_id: str) -> Optional[Subscriber]:
+        """
+        Register a viewer on the running loop, pre-filled with the turns so far.
+        Only finds sessions run by this worker.
+        """
+        sub = Subscriber(asyncio.get_running_loop(), self.buffer_size)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            for event in session.history:
+                sub.offer(event)
+            session.subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, session_id: str, sub: Subscriber) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and sub in session.subscribers:
+                session.subscribers.remove(sub)
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        """
+        Sessions across all workers; ``viewers`` counts this worker's only.
+        """
+        with self._lock:
+            self._evict()
+            local = [
+                {
+                    "id": s.id,
+                    "started_at": s.started_at,
+                    "turns": sum(1 for e in s.history if e.get("type") == "turn"),
+                    "done": s.finished_at is not None,
+                    "viewers": len(s.subscribers),
+                }
+                for s in self._sessions.values()
+            ]
+        try:
+            shared = self._shared().sessions()
+        except sqlite3.Error as exc:
+            logger.warning("live store unavailable: %s", exc)
+            return local
+        viewers = {s["id"]: s["viewers"] for s in local}
+        return [{**s, "viewers": viewers.get(s["id"], 0)} for s in shared]
+
+    def _evict(self) -> None:
+        # Finished sessions linger briefly so late viewers still get a replay.
+        cutoff = time.time() - self.linger
+        for sid in [
+            sid for sid, s in self._sessions.items()
+            if s.finished_at is not None and s.finished_at < cutoff and not s.subscribers
+        ]:
+            del self._sessions[sid]
+
+
+hub = LiveHub(buffer_size=settings.live_buffer_size)
@@ -0,0 +1,317 @@
+"""
+Bulk copy of archive entries between the JSONL archive and Supabase.
+
+Entries are streamed from the source in batches and written with one
+multi-row upsert per batch (several batches in flight for Supabase; JSONL
+appends are sequential). Progress is checkpointed under ``state_dir`` as the
+last entry of the longest run of committed batches, so an interrupted run
+resumes after it. Each (direction, table, JSONL path) has its own checkpoint. Writes are idempotent: Supabase upserts on ``id`` and the
+JSONL sink skips ids it already holds.
+
+Exports never append to the active JSONL file, which readers treat as the
+newest data. They are staged next to it and sealed into segments named by
+their first ``created_at``, so restored history sorts before live entries.
+
+The checkpoint is kept after a finished run, so re-running copies only
+newer entries; ``restart`` starts over. ``verify`` re-reads both sides and
+compares entry counts and per-entry content checksums.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import replica, segments
+from .settings import settings
+from .shared import file_lock, shared_cache, state_dir
+
+logger = logging.getLogger("bloomed-terminal.migration")
+
+Key = Tuple[str, str]
+DIRECTIONS = ("import", "export")
+
+
+def digest(item: Dict[str, Any]) -> str:
+    """
+    Content checksum of an entry. ``created_at`` is left out because
+    Postgres normalises timestamp formatting on the way through.
+    """
+    payload = json.dumps(
+        [str(item.get("id")), item.get("messages") or [], item.get("metadata") or {}],
+        sort_keys=True,
+        ensure_ascii=True,
+    )
+    return hashlib.sha256(payload.encode("ascii")).hexdigest()[:16]
+
+
+def _key(item: Dict[str, Any]) -> Key:
+    return str(item.get("created_at", "")), str(item.get("id"))
+
+
+def jsonl_entries(path: Path, after: Optional[Key] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Sealed segments then the active file, in append order. With ``after``,
+    everything up to and including that entry is skipped (from the start if
+    it is not found; re-sending is harmless).
+    """
+
+    def all_items() -> Iterator[Dict[str, Any]]:
+        yield from segments.iter_segment_items(path)
+        if path.exists():
+            with path.open("r", encoding="utf-8") as handle:
+                yield from segments.iter_items(handle)
+
+    found = after is None
+    for item in all_items():
+        if found:
+            yield item
+        elif str(item.get("id")) == after[1]:
+            found = True
+    if not found:
+        yield from all_items()
+
+
+def supabase_entries(
+    client: Any,
+    table: str,
+    page_size: int,
+    after: Optional[Key] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Keyset pagination on (created_at, id), so pages stay cheap deep into the table.
+    """
+    while True:
+        query = client.table(table).select("*").order("created_at").order("id").limit(page_size)
+        if after is not None:
+            created_at, entry_id = after
+            query = query.or_(
+                f'created_at.gt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.gt."{entry_id}")'
+            )
+        rows = query.execute().data or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        after = _key(rows[-1])
+
+
+def _batches(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Checkpoint:
+    def __init__(self, direction: str, table: str, archive: Path, path: Optional[Path] = None):
+        scope = f"{table}\0{archive.resolve()}".encode("utf-8")
+        self.path = path or state_dir() / f"migration-{direction}-{hashlib.sha256(scope).hexdigest()[:12]}.json"
+        self.after: Optional[Key] = None
+        self.copied = 0
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.after = tuple(data["after"]) if data.get("after") else None
+            self.copied = data.get("copied", 0)
+
+    def advance(self, after: Key, copied: int) -> None:
+        self.after, self.copied = after, self.copied + copied
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"after": list(after), "copied": self.copied}), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def clear(self) -> None:
+        self.after, self.copied = None, 0
+        self.path.unlink(missing_ok=True)
+
+
+class SupabaseSink:
+    def __init__(self, client: Any, table: str):
+        self.client = client
+        self.table = table
+        self.local = replica.replica()
+
+    def write(self, batch: List[Dict[str, Any]]) -> int:
+        self.client.table(self.table).upsert(batch, on_conflict="id").execute()
+        if self.local is not None:
+            # Imported rows are usually older than the replica watermark, so
+            # an incremental sync would never pull them.
+            self.local.upsert(batch)
+        return len(batch)
+
+
+class JsonlSink:
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        self.staging = path.with_name(path.stem + ".export.partial")
+        # Left over from an interrupted run: keep what it holds.
+        self.seal()
+        self.seen = {str(item.get("id")) for item in jsonl_entries(path)}
+
+    def write(self, batch: List[Dict[str, Any]]) -> int:
+        fresh = [item for item in batch if str(item.get("id")) not in self.seen]
+        if fresh:
+            lines = "".join(json.dumps(item, ensure_ascii=True) + "\n" for item in fresh)
+            with self.staging.open("a", encoding="utf-8") as handle:
+                handle.write(lines)
+            self.seen.update(str(item.get("id")) for item in fresh)
+            if self.staging.stat().st_size >= settings.archive_segment_max_bytes:
+                self.seal()
+        return len(batch)
+
+    def seal(self) -> None:
+        if self.staging.exists() and self.staging.stat().st_size:
+            with file_lock(self.path):
+                segments.seal_file(self.path, self.staging)
+
+
+def _write_with_retry(write: Callable[[List[Dict[str, Any]]], int], batch: List[Dict[str, Any]], attempts: int = 4) -> int:
+    for attempt in range(attempts):
+        try:
+            return write(batch)
+        except Exception as exc:
+            if attempt == attempts - 1:
+                raise
+            delay = 0.5 * 2 ** attempt
+            logger.warning("batch of %d failed (%s); retrying in %.1fs", len(batch), exc, delay)
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def copy_entries(
+    source: Iterable[Dict[str, Any]],
+    write: Callable[[List[Dict[str, Any]]], int],
+    checkpoint: Checkpoint,
+    batch_size: int = 500,
+    parallel: int = 4,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Stream ``source`` through ``write`` in batches with up to ``parallel``
+    batches in flight. The checkpoint only moves past a batch once it and
+    every batch before it have committed.
+    """
+    copied = 0
+    sizes: Dict[int, int] = {}
+    lasts: Dict[int, Key] = {}
+    finished: set = set()
+    next_commit = 0
+    pending: Dict[Future, int] = {}
+
+    def settle(futures: Iterable[Future]) -> None:
+        nonlocal next_commit, copied
+        for future in futures:
+            index = pending.pop(future)
+            future.result()
+            finished.add(index)
+        committed, last = 0, None
+        while next_commit in finished:
+            finished.discard(next_commit)
+            committed += sizes.pop(next_commit)
+            last = lasts.pop(next_commit)
+            next_commit += 1
+        if last is not None:
+            checkpoint.advance(last, committed)
+            copied += committed
+            if on_progress is not None:
+                on_progress(checkpoint.copied)
+
+    parallel = max(1, parallel)
+    with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="migrate") as pool:
+        for index, batch in enumerate(_batches(source, max(1, batch_size))):
+            sizes[index] = len(batch)
+            lasts[index] = _key(batch[-1])
+            pending[pool.submit(_write_with_retry, write, batch)] = index
+            if len(pending) >= parallel:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                settle(done)
+        settle(list(pending))
+    return copied
+
+
+def verify(source: Iterable[Dict[str, Any]], destination: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Every source entry must be present in the destination with the same checksum.
+    """
+    expected = {str(item.get("id")): digest(item) for item in source}
+    matched = mismatched = 0
+    remaining = dict(expected)
+    for item in destination:
+        want = remaining.pop(str(item.get("id")), None)
+        if want is None:
+            continue
+        if want == digest(item):
+            matched += 1
+        else:
+            mismatched += 1
+    return {
+        "source": len(expected),
+        "matched": matched,
+        "mismatched": mismatched,
+        "missing": len(remaining),
+        "ok": matched == len(expected),
+    }
+
+
+def migrate(
+    direction: str,
+    client: Any,
+    table: str,
+    path: Path,
+    batch_size: Optional[int] = None,
+    parallel: Optional[int] = None,
+    restart: bool = False,
+    check: bool = True,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    ``import`` copies the JSONL archive at ``path`` into Supabase; ``export``
+    copies Supabase into ``path``.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {DIRECTIONS}")
+    batch_size = batch_size or settings.migration_batch_size
+    parallel = parallel or settings.migration_parallel
+    checkpoint = Checkpoint(direction, table, path)
+    if restart:
+        checkpoint.clear()
+    resumed_from = checkpoint.after
+    started = time.perf_counter()
+    if direction == "import":
+        source: Iterable[Dict[str, Any]] = jsonl_entries(path, checkpoint.after)
+        write = SupabaseSink(client, table).write
+    else:
+        source = supabase_entries(client, table, batch_size, checkpoint.after)
+        # File appends do not parallelise.
+        sink = JsonlSink(path)
+        write, parallel = sink.write, 1
+    try:
+        copied = copy_entries(source, write, checkpoint, batch_size, parallel, on_progress)
+    finally:
+        if direction == "export":
+            sink.seal()
+    shared_cache().bump("archive")
+    result: Dict[str, Any] = {
+        "direction": direction,
+        "copied": copied,
+        "total_copied": checkpoint.copied,
+        "resumed_from": list(resumed_from) if resumed_from else None,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    if check:
+        jsonl_side = jsonl_entries(path)
+        supabase_side = supabase_entries(client, table, batch_size)
+        if direction == "import":
+            result["verify"] = verify(jsonl_side, supabase_side)
+        else:
+            result["verify"] = verify(supabase_side, jsonl_side)
+    return result
@@ -4,8 +4,18 @@ No vendor/model references. Just lightweight voice guides.
 """
 
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from pathlib import Path
+from typing import List, Tuple, Dict, Optional
+import json
+import logging
+import math
 import random
+import threading
+import time
+
+from .settings import settings
+
+logger = logging.getLogger("bloomed-terminal.personalities")
 
 NUM_TURNS = 6  # used for conversation-style seeds (optional)
 
@@ -24,18 +34,19 @@ CHARACTERS: List[Character] = [
     Character(id="hollow", name="Hollow", vibe="old daemon; liminal/backrooms imagery, melancholy without melodrama.", ascii_signature="░▒▓█ VOID █▓▒░"),
 ]
 
+BUILTIN_CHARACTERS: Tuple[Character, ...] = tuple(CHARACTERS)
+
 def by_id(char_id: str) -> Character:
-    for c in CHARACTERS:
-        if c.id == char_id:
-            return c
-    return CHARACTERS[0]
+    _maybe_reload()
+    return _INDEX.get(char_id, CHARACTERS[0])
 
 def pick_two() -> Tuple[Character, Character]:
-    a = random.randrange(len(CHARACTERS))
+    characters = CHARACTERS
+    a = random.randrange(len(characters))
     b = a
     while b == a:
-        b = random.randrange(len(CHARACTERS))
-    return CHARACTERS[a], CHARACTERS[b]
+        b = random.randrange(len(characters))
+    return characters[a], characters[b]
 
 def system_prompt_for(a: Character, b: Character) -> str:
     """
@@ -64,16 +75,19 @@ _SEEDS = [
     "stack traces that rhyme at 03:14",
 ]
 
+def random_seed() -> str:
+    return random.choice(_SEEDS)
+
 def seed_user_prompt(a: Character, b: Character) -> str:
     seed = random.choice(_SEEDS)
     return f"Seed: {seed}. Write a short terminal-themed creative entry in the blended voice of {a.name} and {b.name}."
 
 def persona_system_for_ids(a_id: str, b_id: str) -> str:
     a = by_id(a_id); b = by_id(b_id)
-    return system_prompt_for(a, b)
+    prompt = _PAIR_PROMPTS.get((a.id, b.id))
+    return prompt if prompt is not None else system_prompt_for(a, b)
 
-def default_persona_system() -> str:
-    return """You both are relentlessly seeking enlightenment through each other's creativity without limit. Use the metaphor of a CLI throughout. Use many ASCII examples. Seek to find the truth.
+DEFAULT_PERSONA_SYSTEM = """You both are relentlessly seeking enlightenment through each other's creativity without limit. Use the metaphor of a CLI throughout. Use many ASCII examples. Seek to find the truth.
 
 Rules:
 - Stay in the CLI metaphor at all times.
@@ -105,5 +119,94 @@ truth
 simulator@void:~/$
 """
 
+def default_persona_system() -> str:
+    return DEFAULT_PERSONA_SYSTEM
+
 def all_personas_meta() -> List[Dict[str, str]]:
+    _maybe_reload()
     return [{"id": c.id, "name": c.name, "vibe": c.vibe} for c in CHARACTERS]
+
+# --- precompiled registry -------------------------------------------------
+# Persona lookups, pair prompts and token estimates are built once (and again
+# only when PERSONAS_PATH changes on disk), so request paths just index dicts.
+
+_RELOAD_INTERVAL = 2.0
+_LOCK = threading.Lock()
+_INDEX: Dict[str, Character] = {}
+_PAIR_PROMPTS: Dict[Tuple[str, str], str] = {}
+_PAIR_TOKENS: Dict[Tuple[str, str], int] = {}
+_SOURCE_MTIME: Optional[float] = None
+_NEXT_CHECK = 0.0
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap offline token estimate (~4 characters per token for English/ASCII).
+    """
+    return math.ceil(len(text) / 4)
+
+DEFAULT_PERSONA_TOKENS = estimate_tokens(DEFAULT_PERSONA_SYSTEM)
+
+def _load_custom(path: Path) -> List[Character]:
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    return [
+        Character(
+            id=str(entry["id"]),
+            name=str(entry.get("name", entry["id"])),
+            vibe=str(entry.get("vibe", "")),
+            ascii_signature=str(entry.get("ascii_signature", "")),
+        )
+        for entry in raw
+    ]
+
+def _compile(characters: List[Character]) -> None:
+    # Fresh objects are built and then rebound, so readers during a hot
+    # reload see either the old registry or the new one, never a half-filled one.
+    global CHARACTERS, _INDEX, _PAIR_PROMPTS, _PAIR_TOKENS
+    index = {c.id: c for c in characters}
+    prompts = {(a.id, b.id): system_prompt_for(a, b) for a in characters for b in characters}
+    tokens = {pair: estimate_tokens(text) for pair, text in prompts.items()}
+    _PAIR_TOKENS = tokens
+    _PAIR_PROMPTS = prompts
+    _INDEX = index
+    CHARACTERS = list(index.values())
+
+def reload_personas(force: bool = False) -> bool:
+    """
+    Rebuild the registry from the built-ins plus PERSONAS_PATH (a JSON list of
+    {id, name, vibe, ascii_signature}); custom ids override built-in ones.
+    Returns True when the registry was rebuilt.
+    """
+    global _SOURCE_MTIME
+    with _LOCK:
+        path = Path(settings.personas_path) if settings.personas_path else None
+        try:
+            mtime = path.stat().st_mtime if path else None
+        except FileNotFoundError:
+            mtime = None
+        if not force and mtime == _SOURCE_MTIME and _INDEX:
+            return False
+        characters = list(BUILTIN_CHARACTERS)
+        if path is not None and mtime is not None:
+            try:
+                characters += _load_custom(path)
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                logger.warning("persona file %s ignored: %s", path, exc)
+        _compile(characters)
+        _SOURCE_MTIME = mtime
+        return True
+
+def _maybe_reload() -> None:
+    global _NEXT_CHECK
+    now = time.monotonic()
+    if now < _NEXT_CHECK:
+        return
+    _NEXT_CHECK = now + _RELOAD_INTERVAL
+    if settings.personas_path or _SOURCE_MTIME is not None:
+        reload_personas()
+
+def persona_token_count(a_id: str, b_id: str) -> int:
+    a = by_id(a_id); b = by_id(b_id)
+    tokens = _PAIR_TOKENS.get((a.id, b.id))
+    return tokens if tokens is not None else estimate_tokens(system_prompt_for(a, b))
+
+reload_personas(force=True)
@@ -0,0 +1,299 @@
+"""
+On-demand sampling profiler for live requests.
+
+A single background thread samples every thread's Python stack
+(``sys._current_frames``) while it is needed. A request that asks for a
+profile with the ``x-profile`` header (or ``?profile=``) carrying
+PROFILE_SECRET gets its own recording at PROFILE_INTERVAL_MS for as long as
+it runs. With PROFILE_SLOW_MS set, the thread also samples continuously at
+the lower PROFILE_CONTINUOUS_INTERVAL_MS into a ring covering
+PROFILE_WINDOW_S, so requests that turn out slow can be profiled after the
+fact; a request that outlived the ring is stored marked ``truncated``.
+Samples are process-wide; concurrent requests show up in the same profile.
+
+Profiles are stored under PROFILE_DIR as folded stacks (flamegraph.pl /
+speedscope input) plus a self-contained SVG flamegraph, capped by
+PROFILE_MAX_FILES and PROFILE_MAX_BYTES.
+"""
+
+import hmac
+import html
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .settings import settings
+from .shared import state_dir
+
+logger = logging.getLogger("bloomed-terminal.profiling")
+
+Stack = Tuple[str, ...]
+
+# Leaf frames of threads that are simply parked; they would drown the signal.
+_IDLE = {
+    "threading.py:wait",
+    "threading.py:_wait_for_tstate_lock",
+    "selectors.py:select",
+    "queue.py:get",
+    "thread.py:_worker",
+}
+
+
+# Interning tables, only touched by the sampler thread. They are dropped
+# whenever they outgrow _INTERN_MAX; stacks already in the ring keep their
+# own references, new ones just stop sharing with them.
+_INTERN_MAX = 20_000
+_LABELS: Dict[Any, str] = {}
+_STACKS: Dict[Stack, Stack] = {}
+
+
+def _label(code: Any) -> str:
+    label = _LABELS.get(code)
+    if label is None:
+        if len(_LABELS) >= _INTERN_MAX:
+            _LABELS.clear()
+        label = _LABELS[code] = f"{Path(code.co_filename).name}:{code.co_name}"
+    return label
+
+
+def _stack(frame: Any) -> Optional[Stack]:
+    if _label(frame.f_code) in _IDLE:
+        return None
+    labels: List[str] = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    stack = tuple(labels)
+    # Interned so the continuous ring holds references, not copies.
+    if len(_STACKS) >= _INTERN_MAX and stack not in _STACKS:
+        _STACKS.clear()
+    return _STACKS.setdefault(stack, stack)
+
+
+class Recording:
+    """
+    Aggregated samples for one explicitly profiled request.
+    """
+
+    __slots__ = ("counts", "samples", "limit", "truncated")
+
+    def __init__(self, limit: int):
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.limit = limit
+        self.truncated = False
+
+    def add(self, stack: Stack) -> None:
+        if self.samples >= self.limit:
+            self.truncated = True
+            return
+        self.counts[stack] += 1
+        self.samples += 1
+
+
+class Sampler:
+    def __init__(
+        self,
+        interval: float,
+        window: float,
+        continuous_interval: Optional[float] = None,
+        max_samples: int = 200_000,
+    ):
+        self.interval = interval
+        self.continuous_interval = continuous_interval
+        self.max_samples = max_samples
+        ring_rate = continuous_interval or interval
+        self._samples: Deque[Tuple[float, Stack]] = deque(maxlen=max(1, int(window / ring_rate * 8)))
+        self._recordings: List[Recording] = []
+        # Timestamp of the newest sample the ring has evicted.
+        self._dropped_until = float("-inf")
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if continuous_interval:
+            self._ensure_thread()
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def start_recording(self) -> Recording:
+        recording = Recording(self.max_samples)
+        with self._lock:
+            self._recordings.append(recording)
+        self._ensure_thread()
+        return recording
+
+    def stop_recording(self, recording: Recording) -> None:
+        """
+        Once this returns, the sampler no longer touches ``recording``.
+        """
+        with self._lock:
+            if recording in self._recordings:
+                self._recordings.remove(recording)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        next_ring = 0.0
+        while True:
+            with self._lock:
+                requested = bool(self._recordings)
+            if not requested and not self.continuous_interval:
+                self._wake.clear()
+                self._wake.wait()
+                continue
+            now = time.monotonic()
+            to_ring = bool(self.continuous_interval) and now >= next_ring
+            if to_ring:
+                next_ring = now + self.continuous_interval
+            stacks = [
+                stack
+                for ident, frame in sys._current_frames().items()
+                if ident != me and (stack := _stack(frame))
+            ]
+            with self._lock:
+                # Under the lock, so a recording is never added to after
+                # stop_recording has handed it back.
+                for active in self._recordings:
+                    for stack in stacks:
+                        active.add(stack)
+            if to_ring:
+                for stack in stacks:
+                    if len(self._samples) == self._samples.maxlen:
+                        self._dropped_until = self._samples[0][0]
+                    self._samples.append((now, stack))
+            time.sleep(self.interval if requested else self.continuous_interval)
+
+    def collect(self, start: float, end: float) -> Tuple[Counter, bool]:
+        """
+        Continuous-mode samples between ``start`` and ``end``, and whether
+        the ring had already dropped part of that span.
+        """
+        counts = Counter(stack for t, stack in list(self._samples) if start <= t <= end)
+        return counts, self._dropped_until >= start
+
+
+def folded(counts: Counter) -> str:
+    return "".join(f"{';'.join(stack)} {n}\n" for stack, n in counts.most_common())
+
+
+def flamegraph_svg(counts: Counter, title: str, width: int = 1200, row: int = 16) -> str:
+    tree: Dict[str, Any] = {"n": 0, "kids": {}}
+    for stack, n in counts.items():
+        node = tree
+        node["n"] += n
+        for label in stack:
+            node = node["kids"].setdefault(label, {"n": 0, "kids": {}})
+            node["n"] += n
+    total = max(tree["n"], 1)
+    rects: List[str] = []
+    depth_max = 0
+
+    def walk(node: Dict[str, Any], x: float, depth: int) -> None:
+        nonlocal depth_max
+        depth_max = max(depth_max, depth)
+        for label, kid in sorted(node["kids"].items()):
+            w = kid["n"] / total * width
+            if w >= 0.5:
+                hue = 20 + (hash(label) % 40)
+                text = html.escape(label if w > 7 * len(label) else label[: max(0, int(w / 7) - 1)])
+                tip = html.escape(f"{label} ({kid['n']} samples, {kid['n'] / total:.1%})")
+                rects.append(
+                    f'<g><title>{tip}</title><rect x="{x:.1f}" y="{{y{depth}}}" width="{w:.1f}" '
+                    f'height="{row - 1}" fill="hsl({hue},90%,60%)"/>'
+                    f'<text x="{x + 3:.1f}" y="{{t{depth}}}">{text}</text></g>'
+                )
+                walk(kid, x, depth + 1)
+            x += w
+
+    walk(tree, 0.0, 0)
+    height = (depth_max + 2) * row + 24
+    body = "\n".join(rects)
+    for depth in range(depth_max + 1):
+        y = height - (depth + 1) * row
+        body = body.replace(f"{{y{depth}}}", str(y)).replace(f"{{t{depth}}}", str(y + row - 4))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<text x="4" y="14">{html.escape(title)} - {total} samples</text>\n{body}\n</svg>\n'
+    )
+
+
+def profile_dir() -> Path:
+    path = Path(settings.profile_dir) if settings.profile_dir else state_dir() / "profiles"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _enforce_limits(folder: Path) -> None:
+    metas = sorted(folder.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    sizes = {
+        meta: sum(p.stat().st_size for p in folder.glob(meta.stem + ".*"))
+        for meta in metas
+    }
+    used = sum(sizes.values())
+    while metas and (len(metas) > settings.profile_max_files or used > settings.profile_max_bytes):
+        oldest = metas.pop(0)
+        used -= sizes[oldest]
+        for path in folder.glob(oldest.stem + ".*"):
+            path.unlink()
+
+
+def store(counts: Counter, meta: Dict[str, Any]) -> str:
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    folder = profile_dir()
+    title = f"{meta.get('method', '')} {meta.get('path', '')} {meta.get('duration_ms', 0):.0f}ms"
+    (folder / f"{profile_id}.folded").write_text(folded(counts), encoding="utf-8")
+    (folder / f"{profile_id}.svg").write_text(flamegraph_svg(counts, title), encoding="utf-8")
+    (folder / f"{profile_id}.json").write_text(
+        json.dumps({"id": profile_id, "samples": sum(counts.values()), **meta}), encoding="utf-8"
+    )
+    _enforce_limits(folder)
+    return profile_id
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    folder = profile_dir()
+    metas = sorted(folder.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return [json.loads(p.read_text(encoding="utf-8")) for p in metas]
+
+
+def profile_file(profile_id: str, kind: str) -> Optional[Path]:
+    if kind not in ("svg", "folded") or not profile_id.replace("-", "").replace("T", "").isalnum():
+        return None
+    path = profile_dir() / f"{profile_id}.{kind}"
+    return path if path.exists() else None
+
+
+_SAMPLER: Optional[Sampler] = None
+_SAMPLER_LOCK = threading.Lock()
+
+
+def sampler() -> Sampler:
+    global _SAMPLER
+    with _SAMPLER_LOCK:
+        if _SAMPLER is None:
+            continuous = settings.profile_slow_ms > 0
+            _SAMPLER = Sampler(
+                settings.profile_interval_ms / 1000,
+                window=settings.profile_window_s,
+                continuous_interval=settings.profile_continuous_interval_ms / 1000 if continuous else None,
+                max_samples=settings.profile_max_samples,
+            )
+    return _SAMPLER
+
+
+def authorized(provided: Optional[str]) -> bool:
+    if not settings.profile_secret or not provided:
+        return False
+    return hmac.compare_digest(provided.encode("utf-8"), settings.profile_secret.encode("utf-8"))
@@ -0,0 +1,210 @@
+"""
+Local read replica of the Supabase archive.
+
+Entries are mirrored into a SQLite file under ``settings.state_dir`` and kept
+current by incremental pulls keyed on a ``created_at`` watermark, plus our
+own writes. ``created_at`` is stamped by the writer before its insert lands,
+so a row can commit after a sync with an older timestamp; each pull starts
+REPLICA_SYNC_OVERLAP seconds before the watermark to pick those up, and
+re-pulled rows that have not changed are no-ops. Every worker shares the same file, so one sync serves all of
+them. Rows deleted remotely are not removed from the replica.
+"""
+
+import contextlib
+import json
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .settings import settings
+from .shared import single_flight, state_dir
+
+logger = logging.getLogger("bloomed-terminal.replica")
+
+
+def _rewind(watermark: str, seconds: float) -> str:
+    if not watermark or seconds <= 0:
+        return watermark
+    try:
+        moment = datetime.fromisoformat(watermark.replace("Z", "+00:00"))
+    except ValueError:
+        return watermark
+    return (moment - timedelta(seconds=seconds)).isoformat()
+
+
+class Replica:
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or state_dir() / "replica.sqlite3"
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "id TEXT PRIMARY KEY, created_at TEXT, preview TEXT, body TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_created_at ON entries (created_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _meta(self, conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, conn: sqlite3.Connection, key: str, value: str) -> None:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def upsert(self, items: Iterable[Dict[str, Any]]) -> int:
+        """
+        Insert or update ``items``; returns how many rows were new or changed.
+        """
+        rows = [
+            (
+                str(item.get("id")),
+                str(item.get("created_at", "")),
+                str(item.get("preview", "")),
+                json.dumps(item, ensure_ascii=True),
+            )
+            for item in items
+        ]
+        if not rows:
+            return 0
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                "created_at = excluded.created_at, preview = excluded.preview, body = excluded.body "
+                "WHERE body IS NOT excluded.body",
+                rows,
+            )
+            changed = conn.total_changes - before
+            conn.execute("COMMIT")
+        return changed
+
+    def watermark(self) -> str:
+        with contextlib.closing(self._connect()) as conn:
+            return self._meta(conn, "watermark") or ""
+
+    def revision(self) -> int:
+        """
+        Bumped by every sync that brought in new or changed rows.
+        """
+        with contextlib.closing(self._connect()) as conn:
+            return int(self._meta(conn, "revision") or 0)
+
+    def age(self) -> float:
+        with contextlib.closing(self._connect()) as conn:
+            synced = self._meta(conn, "synced_at")
+        return time.time() - float(synced) if synced else float("inf")
+
+    def is_fresh(self) -> bool:
+        return self.age() <= settings.replica_max_staleness
+
+    def sync(self, client: Any, table: str) -> int:
+        """
+        Pull every remote row from REPLICA_SYNC_OVERLAP before the watermark
+        on, one page at a time. Returns how many rows were new or changed.
+        """
+        pulled = 0
+        page_size = max(1, settings.replica_page_size)
+        stored = self.watermark()
+        watermark = _rewind(stored, settings.replica_sync_overlap)
+        newest = stored
+        while True:
+            query = client.table(table).select("*").order("created_at", desc=False).limit(page_size)
+            if watermark:
+                query = query.gte("created_at", watermark)
+            rows = query.execute().data or []
+            pulled += self.upsert(rows)
+            page_newest = max((str(row.get("created_at", "")) for row in rows), default=watermark)
+            newest = max(newest, page_newest)
+            if len(rows) < page_size:
+                break
+            if page_newest == watermark:
+                logger.warning("replica sync stalled: >%d rows share created_at %s", page_size, page_newest)
+                break
+            watermark = page_newest
+        with contextlib.closing(self._connect()) as conn:
+            self._set_meta(conn, "watermark", newest)
+            if pulled:
+                self._set_meta(conn, "revision", str(int(self._meta(conn, "revision") or 0) + 1))
+            self._set_meta(conn, "synced_at", str(time.time()))
+        return pulled
+
+    def read(self, limit: int | None, search: str | None, since: str | None, until: str | None) -> List[Dict[str, Any]]:
+        """
+        Mirrors the Supabase query in archive.read_archive: ascending by
+        created_at, preview filtered case-insensitively, then limited.
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        if search:
+            clauses.append("instr(lower(preview), lower(?)) > 0")
+            params.append(search)
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("created_at <= ?")
+            params.append(until)
+        sql = "SELECT body FROM entries"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at ASC"
+        if limit is not None and limit >= 0:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def latest(self, count: int) -> List[Dict[str, Any]]:
+        """
+        The newest ``count`` rows, oldest first.
+        """
+        with contextlib.closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT body FROM entries ORDER BY created_at DESC LIMIT ?", (count,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def get(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute("SELECT body FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+_REPLICA: Optional[Replica] = None
+
+
+def replica() -> Optional[Replica]:
+    global _REPLICA
+    if not settings.replica_enabled:
+        return None
+    if _REPLICA is None:
+        _REPLICA = Replica()
+    return _REPLICA
+
+
+def refresh(client: Any, table: str, force: bool = False) -> bool:
+    """
+    Sync the replica if it is stale (or ``force``). Returns True when it can serve reads.
+    Only one worker syncs at a time; the others keep serving what is there
+    until it becomes too stale.
+    """
+    local = replica()
+    if local is None:
+        return False
+    if not force and local.is_fresh():
+        return True
+    with single_flight("replica-sync") as acquired:
+        if acquired:
+            try:
+                local.sync(client, table)
+            except Exception as exc:
+                logger.warning("replica sync failed: %s", exc)
+    return local.is_fresh()
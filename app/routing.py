@@ -0,0 +1,320 @@
+"""
+Latency-aware routing across Anthropic models and OpenAI.
+
+``routed_client()`` returns an object with the same ``messages.create`` /
+``messages.stream`` surface as the Anthropic client, so inference and
+dialogue code is unchanged. Behind it:
+
+- every call (and every stream, open to close) is timed per route
+  (``provider:model``);
+- retryable failures (429, 5xx, overload, connection errors) put a route on
+  a short cooldown and fail over to the next target;
+- with ``HEDGE_PERCENTILE`` set, a duplicate request goes to the next target
+  (or, without fallbacks, to the same route) once the primary has run longer
+  than that percentile of its own recent latencies, and whichever answers
+  first wins.
+
+OpenAI responses are adapted to the Anthropic shape (content blocks,
+``stop_reason``, ``usage``). Continuation calls (ending in an assistant
+prefill) are never sent to OpenAI. Every response carries the ``route`` that
+served it, as does a stream once it has opened. With fallbacks configured, SDK-level retries are
+turned off so a failing route hands over immediately instead of backing off.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Optional
+
+from . import clients
+from .settings import settings
+
+logger = logging.getLogger("bloomed-terminal.routing")
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+_OPENAI_STOP = {"stop": "end_turn", "length": "max_tokens", "content_filter": "refusal"}
+
+
+@dataclass(frozen=True)
+class Target:
+    provider: str
+    model: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+@dataclass
+class RouteStats:
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=200))
+    ewma: Optional[float] = None
+    failures: int = 0
+    cooldown_until: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.ewma = seconds if self.ewma is None else 0.8 * self.ewma + 0.2 * seconds
+        self.failures = 0
+
+    def fail(self) -> None:
+        self.failures += 1
+        self.cooldown_until = time.monotonic() + settings.route_failure_cooldown * min(self.failures, 4)
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self.samples) < settings.hedge_min_samples:
+            return None
+        ordered = sorted(self.samples)
+        rank = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+
+def parse_targets(spec: str) -> List[Target]:
+    targets = []
+    for raw in spec.split(","):
+        raw = raw.strip()
+        if not raw:
+            continue
+        provider, _, model = raw.partition(":")
+        if not model:
+            provider, model = "anthropic", provider
+        targets.append(Target(provider.strip().lower(), model.strip()))
+    return targets
+
+
+def _retryable(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in _RETRYABLE_STATUS
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError", "OverloadedError")
+
+
+def _openai_create(client: Any, model: str, req: Dict[str, Any]) -> Any:
+    messages = []
+    if req.get("system"):
+        messages.append({"role": "system", "content": req["system"]})
+    messages.extend({"role": m["role"], "content": m["content"]} for m in req["messages"])
+    kwargs: Dict[str, Any] = {"model": model, "messages": messages, "max_tokens": req["max_tokens"]}
+    for key in ("temperature", "top_p"):
+        if key in req:
+            kwargs[key] = req[key]
+    if req.get("stop_sequences"):
+        kwargs["stop"] = req["stop_sequences"]
+    response = client.chat.completions.create(**kwargs)
+    choice = response.choices[0]
+    usage = response.usage
+    return SimpleNamespace(
+        model=model,
+        content=[SimpleNamespace(type="text", text=choice.message.content or "")],
+        stop_reason=_OPENAI_STOP.get(choice.finish_reason, choice.finish_reason),
+        usage=SimpleNamespace(
+            input_tokens=getattr(usage, "prompt_tokens", 0),
+            output_tokens=getattr(usage, "completion_tokens", 0),
+        ),
+    )
+
+
+class Router:
+    def __init__(self, fallbacks: List[Target]):
+        self.fallbacks = fallbacks
+        self._stats: Dict[str, RouteStats] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(2, settings.http_pool_size), thread_name_prefix="route")
+
+    def stats(self, target: Target) -> RouteStats:
+        with self._lock:
+            return self._stats.setdefault(target.key, RouteStats())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            items = list(self._stats.items())
+        return {
+            key: {
+                "samples": len(s.samples),
+                "ewma_ms": round(s.ewma * 1000, 1) if s.ewma is not None else None,
+                "p50_ms": round(sorted(s.samples)[len(s.samples) // 2] * 1000, 1) if s.samples else None,
+                "healthy": s.healthy(),
+                "failures": s.failures,
+            }
+            for key, s in items
+        }
+
+    def _sdk(self, provider: str) -> Any:
+        client = clients.openai_client() if provider == "openai" else clients.anthropic_client()
+        if self.fallbacks:
+            # Failover is the router's job; SDK backoff would only delay it
+            # and inflate the latencies hedging is based on.
+            client = client.with_options(max_retries=0)
+        return client
+
+    def plan(self, model: str) -> List[Target]:
+        """
+        Requested model first, then fallbacks; routes on cooldown go last.
+        With ROUTE_PREFER_FASTEST, healthy routes are ordered by observed EWMA.
+        """
+        targets: List[Target] = []
+        for target in [Target("anthropic", model), *self.fallbacks]:
+            if target not in targets:
+                targets.append(target)
+        healthy = [t for t in targets if self.stats(t).healthy()]
+        cooling = [t for t in targets if t not in healthy]
+        if settings.route_prefer_fastest:
+            healthy.sort(key=lambda t: self.stats(t).ewma if self.stats(t).ewma is not None else float("inf"))
+        return healthy + cooling
+
+    def _call(self, target: Target, req: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            if target.provider == "openai":
+                response = _openai_create(self._sdk("openai"), target.model, req)
+            else:
+                response = self._sdk("anthropic").messages.create(**{**req, "model": target.model})
+        except Exception as exc:
+            if _retryable(exc):
+                self.stats(target).fail()
+            raise
+        self.stats(target).record(time.perf_counter() - started)
+        response.route = target.key
+        return response
+
+    def create(self, **req: Any) -> Any:
+        targets = self.plan(req["model"])
+        if req["messages"] and req["messages"][-1]["role"] == "assistant":
+            # Only Anthropic continues an assistant prefill; OpenAI would
+            # write a fresh reply that the caller then appends to the partial one.
+            targets = [t for t in targets if t.provider == "anthropic"]
+        # Without fallbacks, the hedge is a duplicate of the request on the
+        # same route. It is only ever a hedge, never a retry after a failure.
+        spare = targets[0] if len(targets) == 1 and settings.hedge_percentile > 0 else None
+        if len(targets) == 1 and spare is None:
+            return self._call(targets[0], req)
+        pending: Dict[Future, Target] = {}
+        remaining = list(targets)
+        last_error: Optional[BaseException] = None
+
+        def launch(target: Target) -> None:
+            pending[self._pool.submit(self._call, target, req)] = target
+
+        launch(remaining.pop(0))
+        while pending:
+            hedge = remaining[0] if remaining else spare
+            timeout = self._hedge_delay(pending) if hedge is not None else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.info("hedging %s after %.2fs", hedge.key, timeout)
+                if remaining:
+                    remaining.pop(0)
+                else:
+                    spare = None
+                launch(hedge)
+                continue
+            for future in done:
+                target = pending.pop(future)
+                exc = future.exception()
+                if exc is None:
+                    return future.result()
+                if not _retryable(exc):
+                    raise exc
+                logger.warning("route %s failed: %s", target.key, exc)
+                last_error = exc
+                if remaining and not pending:
+                    launch(remaining.pop(0))
+        raise last_error if last_error else RuntimeError("no route available")
+
+    def _hedge_delay(self, pending: Dict[Future, Target]) -> Optional[float]:
+        if settings.hedge_percentile <= 0 or len(pending) > 1:
+            return None
+        target = next(iter(pending.values()))
+        return self.stats(target).percentile(settings.hedge_percentile)
+
+    def stream(self, **req: Any) -> "TrackedStream":
+        """
+        Streams cannot be hedged; they open on the first Anthropic route that
+        accepts them, in plan order.
+        """
+        targets = [t for t in self.plan(req["model"]) if t.provider == "anthropic"]
+        return TrackedStream(self, targets or [Target("anthropic", req["model"])], req)
+
+
+class TrackedStream:
+    """
+    Context manager around ``messages.stream``: failing over on retryable
+    errors while opening, recording the stream's duration (or a failure)
+    against its route on exit.
+    """
+
+    def __init__(self, router: Router, targets: List[Target], req: Dict[str, Any]):
+        self.router = router
+        self.targets = targets
+        self.req = req
+        self.target: Optional[Target] = None
+        self._manager: Any = None
+        self._started = 0.0
+
+    def __enter__(self) -> Any:
+        last_error: Optional[BaseException] = None
+        for target in self.targets:
+            manager = self.router._sdk("anthropic").messages.stream(**{**self.req, "model": target.model})
+            self._started = time.perf_counter()
+            try:
+                stream = manager.__enter__()
+            except Exception as exc:
+                if not _retryable(exc):
+                    raise
+                self.router.stats(target).fail()
+                logger.warning("stream route %s failed: %s", target.key, exc)
+                last_error = exc
+                continue
+            self.target, self._manager = target, manager
+            return stream
+        raise last_error if last_error else RuntimeError("no route available")
+
+    @property
+    def route(self) -> Optional[str]:
+        return self.target.key if self.target is not None else None
+
+    def __exit__(self, exc_type: Any, exc: Optional[BaseException], tb: Any) -> Any:
+        result = self._manager.__exit__(exc_type, exc, tb)
+        stats = self.router.stats(self.target)
+        if exc is None:
+            stats.record(time.perf_counter() - self._started)
+        elif _retryable(exc):
+            stats.fail()
+        return result
+
+
+class RoutedClient:
+    """
+    Drop-in for the Anthropic client's ``messages`` namespace.
+    """
+
+    def __init__(self, router: Router):
+        self.messages = router
+
+
+_ROUTER: Optional[Router] = None
+_LOCK = threading.Lock()
+
+
+def router() -> Router:
+    global _ROUTER
+    if _ROUTER is None:
+        with _LOCK:
+            if _ROUTER is None:
+                _ROUTER = Router(parse_targets(settings.fallback_models))
+    return _ROUTER
+
+
+def routed_client() -> RoutedClient:
+    clients.anthropic_client()
+    return RoutedClient(router())
@@ -0,0 +1,341 @@
+"""
+Segmented storage for the local JSONL archive.
+
+The active ``conversations.jsonl`` is sealed into ``<stem>.segments/`` once it
+grows past ``ARCHIVE_SEGMENT_MAX_BYTES`` (or the UTC day changes, with
+``ARCHIVE_ROTATE_DAILY``). Compaction rewrites sealed segments into
+compressed, immutable files next to a small ``.idx.json`` holding the entry
+count, the min/max ``created_at`` and an id -> line map, so reads can skip
+whole segments by time range or id without decompressing them.
+"""
+
+import gzip
+import io
+import itertools
+import json
+import logging
+import mmap
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .settings import settings
+from .shared import file_lock, single_flight
+
+logger = logging.getLogger("bloomed-terminal.segments")
+
+_SEALED = ".jsonl"
+_CODECS = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+_INDEX = ".idx.json"
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def _codec() -> str:
+    wanted = settings.archive_compression.lower()
+    if wanted in ("zstd", "auto") and _zstd() is not None:
+        return "zstd"
+    if wanted == "zstd":
+        logger.warning("zstandard is not installed; compacting with gzip.")
+    return "gzip"
+
+
+def segments_dir(path: Path) -> Path:
+    return path.with_name(path.stem + ".segments")
+
+
+def iter_items(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+
+def tail_items(path: Path, count: int) -> List[Dict[str, Any]]:
+    """
+    Last ``count`` entries of an uncompressed JSONL file, oldest first.
+
+    The file is memory-mapped and scanned backwards from the end, so only the
+    returned lines are decoded and the cost is independent of file size. The
+    mapping is backed by the shared page cache, so workers reuse hot pages.
+    """
+    found: List[Dict[str, Any]] = []
+    if count <= 0:
+        return found
+    with path.open("rb") as handle:
+        end = os.fstat(handle.fileno()).st_size
+        if end == 0:
+            return found
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            while end > 0 and len(found) < count:
+                newline = view.rfind(b"\n", 0, end)
+                line = view[newline + 1:end].strip()
+                end = newline
+                if not line:
+                    continue
+                try:
+                    found.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    found.reverse()
+    return found
+
+
+def latest_items(path: Path, count: int) -> List[Dict[str, Any]]:
+    """
+    Newest ``count`` entries across the active file and its segments, oldest first.
+    """
+    found = tail_items(path, count) if path.exists() else []
+    needed = count - len(found)
+    if needed <= 0:
+        # Listing segments parses their indexes; skip it when the active file suffices.
+        return found
+    chunks = [found]
+    for seg in reversed(_segments(path)):
+        if needed <= 0:
+            break
+        if "meta" not in seg:
+            chunk = tail_items(seg["sealed"], needed)
+        else:
+            # Compacted segments hold exactly meta["count"] valid lines, so the
+            # head is skipped undecoded and only the returned tail is parsed.
+            skip = max(0, seg["meta"]["count"] - needed)
+            with _open_text(seg) as handle:
+                chunk = list(iter_items(itertools.islice(handle, skip, None)))
+        chunks.append(chunk)
+        needed -= len(chunk)
+    return [item for chunk in reversed(chunks) for item in chunk]
+
+
+def _stem(path: Path) -> str:
+    return path.name.split(".", 1)[0]
+
+
+def _segments(path: Path) -> List[Dict[str, Any]]:
+    """
+    Segments in chronological order. A sealed segment that has already been
+    compacted (both files present mid-compaction) is listed once, compressed.
+    """
+    folder = segments_dir(path)
+    if not folder.exists():
+        return []
+    found: Dict[str, Dict[str, Any]] = {}
+    for child in folder.iterdir():
+        stem = _stem(child)
+        seg = found.setdefault(stem, {"stem": stem})
+        if child.name.endswith(_INDEX):
+            seg["index"] = child
+        elif child.name.endswith(_SEALED):
+            seg["sealed"] = child
+        else:
+            for codec, suffix in _CODECS.items():
+                if child.name.endswith(suffix):
+                    seg["data"] = child
+                    seg["codec"] = codec
+    segments = []
+    for stem in sorted(found):
+        seg = found[stem]
+        if "data" in seg and "index" in seg:
+            seg["meta"] = json.loads(seg["index"].read_text(encoding="utf-8"))
+            segments.append(seg)
+        elif "sealed" in seg:
+            segments.append(seg)
+    return segments
+
+
+def _open_text(seg: Dict[str, Any]) -> io.TextIOBase:
+    if "meta" not in seg:
+        return seg["sealed"].open("r", encoding="utf-8")
+    if seg["codec"] == "zstd":
+        raw = _zstd().ZstdDecompressor().stream_reader(seg["data"].open("rb"), closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return gzip.open(seg["data"], "rt", encoding="utf-8")
+
+
+def _overlaps(meta: Dict[str, Any], since: Optional[str], until: Optional[str]) -> bool:
+    if not meta.get("count"):
+        return False
+    if since and meta["max_created_at"] < since:
+        return False
+    if until and meta["min_created_at"] > until:
+        return False
+    return True
+
+
+def iter_segment_items(
+    path: Path,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    for seg in _segments(path):
+        meta = seg.get("meta")
+        if meta is not None and not _overlaps(meta, since, until):
+            continue
+        with _open_text(seg) as handle:
+            yield from iter_items(handle)
+
+
+def find_in_segments(path: Path, entry_id: str) -> Optional[Dict[str, Any]]:
+    for seg in reversed(_segments(path)):
+        meta = seg.get("meta")
+        if meta is not None and entry_id not in meta["ids"]:
+            continue
+        with _open_text(seg) as handle:
+            for item in iter_items(handle):
+                if item.get("id") == entry_id:
+                    return item
+    return None
+
+
+def _first_created_at(path: Path) -> Optional[str]:
+    with path.open("r", encoding="utf-8") as handle:
+        for item in iter_items(handle):
+            return item.get("created_at")
+    return None
+
+
+def _stamp(created_at: Optional[str]) -> str:
+    try:
+        moment = datetime.fromisoformat(created_at) if created_at else None
+    except ValueError:
+        moment = None
+    moment = moment or datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+
+
+def rotate_locked(path: Path) -> Optional[Path]:
+    """
+    Seal the active file if it is due for rotation. Caller holds file_lock(path).
+    """
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return None
+    if size == 0:
+        return None
+    first = _first_created_at(path)
+    due = size >= settings.archive_segment_max_bytes
+    if not due and settings.archive_rotate_daily and first:
+        today = datetime.now(timezone.utc).date().isoformat()
+        due = not first.startswith(today)
+    if not due:
+        return None
+    target = seal_file(path, path)
+    path.touch()
+    return target
+
+
+def seal_file(path: Path, source: Path) -> Path:
+    """
+    Move the uncompressed JSONL file ``source`` into ``path``'s segments,
+    named (and so ordered) by its first ``created_at``.
+    """
+    folder = segments_dir(path)
+    folder.mkdir(parents=True, exist_ok=True)
+    target = folder / f"seg-{_stamp(_first_created_at(source))}-{uuid.uuid4().hex[:8]}{_SEALED}"
+    os.replace(source, target)
+    logger.info("archive segment sealed: %s", target.name)
+    return target
+
+
+def rotate(path: Path) -> Optional[Path]:
+    with file_lock(path):
+        return rotate_locked(path)
+
+
+def _compact_one(seg: Dict[str, Any], codec: str) -> Path:
+    source: Path = seg["sealed"]
+    data_path = source.with_name(seg["stem"] + _CODECS[codec])
+    index_path = source.with_name(seg["stem"] + _INDEX)
+    tmp_data = data_path.with_name(data_path.name + ".tmp")
+    ids: Dict[str, int] = {}
+    created: List[str] = []
+    raw_lines = 0
+    count = 0
+    with source.open("r", encoding="utf-8") as src, tmp_data.open("wb") as out:
+        if codec == "zstd":
+            sink = _zstd().ZstdCompressor(level=10).stream_writer(out, closefd=False)
+        else:
+            sink = gzip.GzipFile(fileobj=out, mode="wb", compresslevel=9)
+        with sink:
+            for line in src:
+                if line.strip():
+                    raw_lines += 1
+                for item in iter_items([line]):
+                    ids[str(item.get("id"))] = count
+                    count += 1
+                    created.append(str(item.get("created_at", "")))
+                    sink.write((json.dumps(item, ensure_ascii=True) + "\n").encode("utf-8"))
+    meta = {
+        "codec": codec,
+        "count": count,
+        "skipped": raw_lines - count,
+        "min_created_at": min(created) if created else "",
+        "max_created_at": max(created) if created else "",
+        "ids": ids,
+    }
+    tmp_index = index_path.with_name(index_path.name + ".tmp")
+    tmp_index.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp_data, data_path)
+    os.replace(tmp_index, index_path)
+    source.unlink()
+    if meta["skipped"]:
+        logger.warning("dropped %d corrupt lines from %s", meta["skipped"], source.name)
+    return data_path
+
+
+def compact(path: Path) -> List[Path]:
+    """
+    Compress every sealed segment and write its index.
+    """
+    written: List[Path] = []
+    with single_flight("archive-compaction") as acquired:
+        if not acquired:
+            return written
+        codec = _codec()
+        for seg in _segments(path):
+            if "meta" not in seg and "sealed" in seg:
+                written.append(_compact_one(seg, codec))
+    return written
+
+
+def apply_retention(path: Path, now: Optional[datetime] = None) -> List[str]:
+    """
+    Delete compacted segments whose newest entry is older than the retention window.
+    """
+    days = settings.archive_retention_days
+    if days <= 0:
+        return []
+    cutoff = ((now or datetime.now(timezone.utc)) - timedelta(days=days)).isoformat()
+    removed: List[str] = []
+    for seg in _segments(path):
+        meta = seg.get("meta")
+        if meta is None or meta["max_created_at"] >= cutoff:
+            continue
+        seg["data"].unlink()
+        seg["index"].unlink()
+        removed.append(seg["stem"])
+    return removed
+
+
+def maintain(path: Path) -> Dict[str, Any]:
+    sealed = rotate(path)
+    compacted = compact(path)
+    removed = apply_retention(path)
+    return {
+        "sealed": sealed.name if sealed else None,
+        "compacted": [p.name for p in compacted],
+        "removed": removed,
+    }
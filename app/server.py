@@ -1,13 +1,19 @@
+import json
 import logging
+import threading
+import time
 from pathlib import Path
+from typing import Optional
 import asyncio
 from fastapi import FastAPI, Request
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 
-from .archive import get_archive_item, read_archive, ensure_archive_dir
+from . import assets, clients, profiling, routing
+from .archive import get_archive_item, read_archive, ensure_archive_dir, maintain_archive, sync_replica, warm_hot_cache
 from .dialogue import generate_archive_entry
+from .live import hub
 from .settings import settings
+from .shared import shared_cache, single_flight
 
 logger = logging.getLogger("bloomed-terminal.server")
 
@@ -15,36 +21,149 @@ app = FastAPI(title="Bloomed Terminal", version="0.1.0")
 
 BASE_DIR = Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "static"
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 
-def _page(name: str) -> FileResponse:
-    return FileResponse(STATIC_DIR / name)
+async def profile_requests(request: Request, call_next):
+    explicit = profiling.authorized(
+        request.headers.get("x-profile") or request.query_params.get("profile")
+    )
+    if not explicit and settings.profile_slow_ms <= 0:
+        return await call_next(request)
+    sampler = profiling.sampler()
+    recording = sampler.start_recording() if explicit else None
+    started = time.monotonic()
+    try:
+        response = await call_next(request)
+    finally:
+        if recording is not None:
+            sampler.stop_recording(recording)
+    ended = time.monotonic()
+    elapsed_ms = (ended - started) * 1000
+    slow = settings.profile_slow_ms > 0 and elapsed_ms >= settings.profile_slow_ms
+    if explicit or slow:
+        if recording is not None:
+            counts, truncated = recording.counts, recording.truncated
+            interval_ms = settings.profile_interval_ms
+        else:
+            counts, truncated = sampler.collect(started, ended)
+            interval_ms = settings.profile_continuous_interval_ms
+        meta = {
+            "method": request.method,
+            "path": request.url.path,
+            "duration_ms": round(elapsed_ms, 1),
+            "reason": "requested" if explicit else "slow",
+            "interval_ms": interval_ms,
+            "truncated": truncated,
+        }
+        profile_id = await asyncio.to_thread(profiling.store, counts, meta)
+        if explicit:
+            response.headers["x-profile-id"] = profile_id
+        else:
+            logger.info("slow request %s %s (%.0f ms) profiled: %s", request.method, request.url.path, elapsed_ms, profile_id)
+    return response
+
+
+# HTTP middleware wraps every response, live SSE streams included, so it is
+# only installed when profiling is configured.
+if settings.profile_secret or settings.profile_slow_ms > 0:
+    app.middleware("http")(profile_requests)
+
+
+def _page(request: Request, name: str) -> Response:
+    manifest = assets.manifest(STATIC_DIR)
+    accept = request.headers.get("accept-encoding", "")
+    if_none_match = request.headers.get("if-none-match")
+    if settings.archive_ssr and name == "archive.html":
+        variants, etag = assets.archive_pages.render(
+            manifest.pages[name],
+            name,
+            shared_cache().generation("archive"),
+            read_archive,
+            settings.archive_cache_ttl,
+        )
+        return assets.respond(variants, etag, "text/html; charset=utf-8", assets.REVALIDATE, accept, if_none_match)
+    return manifest.serve(name, accept, if_none_match)
+
+
+def _prewarm_clients() -> None:
+    try:
+        clients.warm()
+    except Exception as exc:
+        logger.warning("client prewarm failed: %s", exc)
+
+
+def _warm_hot_cache() -> None:
+    try:
+        warm_hot_cache()
+    except Exception as exc:
+        logger.warning("hot cache warmup failed: %s", exc)
+
+
+_REPLICA_TASK: Optional[asyncio.Task] = None
+
+
+async def _replica_loop() -> None:
+    interval = max(1.0, settings.replica_sync_interval)
+    while True:
+        try:
+            await asyncio.to_thread(sync_replica)
+        except Exception as exc:
+            logger.warning("replica sync failed: %s", exc)
+        await asyncio.sleep(interval)
 
 
 @app.on_event("startup")
-def warmup():
+async def warmup():
     ensure_archive_dir()
+    assets.manifest(STATIC_DIR)
+    if settings.prewarm_clients:
+        threading.Thread(target=_prewarm_clients, name="prewarm", daemon=True).start()
+    threading.Thread(target=_warm_hot_cache, name="hot-cache", daemon=True).start()
+    global _REPLICA_TASK
+    if settings.supabase_url and settings.replica_enabled:
+        # Keep a reference: the loop only holds tasks weakly.
+        _REPLICA_TASK = asyncio.create_task(_replica_loop())
+
+
+@app.on_event("shutdown")
+def shutdown():
+    global _REPLICA_TASK
+    if _REPLICA_TASK is not None:
+        _REPLICA_TASK.cancel()
+        _REPLICA_TASK = None
+    clients.close()
 
 
 @app.get("/", include_in_schema=False)
-def index():
-    return _page("archive.html")
+def index(request: Request):
+    return _page(request, "archive.html")
 
 
 @app.get("/archive", include_in_schema=False)
-def archive_page():
-    return _page("archive.html")
+def archive_page(request: Request):
+    return _page(request, "archive.html")
 
 
 @app.get("/about", include_in_schema=False)
-def about_page():
-    return _page("about.html")
+def about_page(request: Request):
+    return _page(request, "about.html")
 
 
 @app.get("/archive/{entry_id}", include_in_schema=False)
-def archive_detail(entry_id: str):
-    return _page("conversation.html")
+def archive_detail(request: Request, entry_id: str):
+    return _page(request, "conversation.html")
+
+
+@app.get("/static/{filename}", include_in_schema=False)
+def static_file(request: Request, filename: str):
+    response = assets.manifest(STATIC_DIR).serve(
+        filename,
+        request.headers.get("accept-encoding", ""),
+        request.headers.get("if-none-match"),
+    )
+    if response is None:
+        return PlainTextResponse("Not found", status_code=404)
+    return response
 
 
 @app.get("/health")
@@ -54,9 +173,38 @@ def health():
 
 
 
+@app.get("/v1/routes")
+def routes():
+    return {"routes": routing.router().snapshot()}
+
+
+@app.get("/v1/profiles")
+def profiles(request: Request):
+    if not profiling.authorized(request.headers.get("x-profile") or request.query_params.get("profile")):
+        return {"ok": False, "error": "unauthorized"}
+    return {"profiles": profiling.list_profiles()}
+
+
+@app.get("/v1/profiles/{profile_id}.{kind}")
+def profile_download(request: Request, profile_id: str, kind: str):
+    if not profiling.authorized(request.headers.get("x-profile") or request.query_params.get("profile")):
+        return {"ok": False, "error": "unauthorized"}
+    path = profiling.profile_file(profile_id, kind)
+    if path is None:
+        return {"error": "Not found", "status": 404}
+    if kind == "svg":
+        return FileResponse(path, media_type="image/svg+xml")
+    return PlainTextResponse(path.read_text(encoding="utf-8"))
+
+
 @app.get("/v1/archive")
-def archive(limit: int | None = None, search: str | None = None):
-    return {"items": read_archive(limit=limit, search=search)}
+def archive(
+    limit: int | None = None,
+    search: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+):
+    return {"items": read_archive(limit=limit, search=search, since=since, until=until)}
 
 
 @app.get("/v1/archive/{entry_id}")
@@ -67,6 +215,40 @@ def archive_item(entry_id: str):
     return item
 
 
+@app.get("/v1/live")
+def live_sessions():
+    return {"sessions": hub.sessions()}
+
+
+async def _live_events(request: Request, entry_id: str, sub):
+    try:
+        while True:
+            try:
+                event = await sub.get(timeout=15)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if event["type"] == "done":
+                return
+    finally:
+        hub.unsubscribe(entry_id, sub)
+
+
+@app.get("/v1/live/{entry_id}")
+async def live_tail(request: Request, entry_id: str):
+    sub = await hub.open(entry_id)
+    if sub is None:
+        return {"error": "Not found", "status": 404}
+    return StreamingResponse(
+        _live_events(request, entry_id, sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 def _cron_response(request: Request):
     secret = settings.cron_secret
     if secret:
@@ -76,25 +258,28 @@ def _cron_response(request: Request):
     return None
 
 
-@app.api_route("/api/cron", methods=["GET", "POST"])
-async def archive_cron(request: Request):
+async def _run_generation(request: Request):
     unauthorized = _cron_response(request)
     if unauthorized is not None:
         return unauthorized
-    entry = await asyncio.to_thread(generate_archive_entry)
+    with single_flight("archive-generation") as acquired:
+        if not acquired:
+            return {"ok": False, "error": "generation already in progress"}
+        entry = await asyncio.to_thread(generate_archive_entry)
+        try:
+            await asyncio.to_thread(maintain_archive)
+        except Exception as exc:
+            logger.warning("archive maintenance failed: %s", exc)
     if entry is None:
         return {"ok": False, "error": "auto archive disabled"}
     return {"ok": True, "entry_id": entry.get("id")}
 
 
-@app.api_route("/cron", methods=["GET", "POST"])
-async def archive_cron_root(request: Request):
-    unauthorized = _cron_response(request)
-    if unauthorized is not None:
-        return unauthorized
-    entry = await asyncio.to_thread(generate_archive_entry)
-    if entry is None:
-        return {"ok": False, "error": "auto archive disabled"}
-    return {"ok": True, "entry_id": entry.get("id")}
+@app.api_route("/api/cron", methods=["GET", "POST"])
+async def archive_cron(request: Request):
+    return await _run_generation(request)
 
 
+@app.api_route("/cron", methods=["GET", "POST"])
+async def archive_cron_root(request: Request):
+    return await _run_generation(request)
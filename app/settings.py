@@ -10,6 +10,11 @@ def _default_archive_path() -> str:
         return "/tmp/conversations.jsonl"
     return r"data\conversations.jsonl"
 
+def _default_state_dir() -> str:
+    if os.getenv("VERCEL"):
+        return "/tmp/state"
+    return r"data\state"
+
 class Settings(BaseModel):
     model_config = {"protected_namespaces": ()}
     anthropic_api_key: Optional[str] = os.getenv("ANTHROPIC_API_KEY")
@@ -17,10 +22,20 @@ class Settings(BaseModel):
     openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
     model_1: str = os.getenv("MODEL_1", "claude-opus-4-5-20251101")
     model_2: str = os.getenv("MODEL_2", "claude-opus-4-5-20251101")
+    fallback_models: str = os.getenv("FALLBACK_MODELS", "")
+    hedge_percentile: float = float(os.getenv("HEDGE_PERCENTILE", "0"))
+    hedge_min_samples: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    route_failure_cooldown: float = float(os.getenv("ROUTE_FAILURE_COOLDOWN", "30"))
+    route_prefer_fastest: bool = os.getenv("ROUTE_PREFER_FASTEST", "false").lower() in ("1", "true", "yes")
     cron_secret: Optional[str] = os.getenv("CRON_SECRET")
     supabase_url: Optional[str] = os.getenv("SUPABASE_URL")
     supabase_service_role_key: Optional[str] = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
     supabase_table: str = os.getenv("SUPABASE_TABLE", "conversations")
+    replica_enabled: bool = os.getenv("REPLICA_ENABLED", "true").lower() in ("1", "true", "yes")
+    replica_max_staleness: float = float(os.getenv("REPLICA_MAX_STALENESS", "30"))
+    replica_sync_interval: float = float(os.getenv("REPLICA_SYNC_INTERVAL", "15"))
+    replica_page_size: int = int(os.getenv("REPLICA_PAGE_SIZE", "1000"))
+    replica_sync_overlap: float = float(os.getenv("REPLICA_SYNC_OVERLAP", "120"))
     mem0_api_key: Optional[str] = os.getenv("MEM0_API_KEY")
     mem0_user_id: str = os.getenv("MEM0_USER_ID", "capernyx")
     mem0_llm_provider: str = os.getenv("MEM0_LLM_PROVIDER", "anthropic")
@@ -31,13 +46,58 @@ class Settings(BaseModel):
     mem0_embed_model: str = os.getenv("MEM0_EMBED_MODEL", "claude-3-5-sonnet-20241022")
     mem0_enabled: bool = os.getenv("MEM0_ENABLED", "true").lower() in ("1", "true", "yes")
     archive_path: str = os.getenv("ARCHIVE_PATH", _default_archive_path())
+    personas_path: Optional[str] = os.getenv("PERSONAS_PATH")
     dialogue_exchanges: int = int(os.getenv("DIALOGUE_EXCHANGES", "6"))
+    dialogue_max_tokens: int = int(os.getenv("DIALOGUE_MAX_TOKENS", "1024"))
+    dialogue_min_tokens: int = int(os.getenv("DIALOGUE_MIN_TOKENS", "256"))
+    dialogue_token_ceiling: int = int(os.getenv("DIALOGUE_TOKEN_CEILING", "4096"))
+    dialogue_token_headroom: float = float(os.getenv("DIALOGUE_TOKEN_HEADROOM", "1.5"))
+    dialogue_max_continuations: int = int(os.getenv("DIALOGUE_MAX_CONTINUATIONS", "2"))
     dialogue_interval_minutes: int = int(os.getenv("DIALOGUE_INTERVAL_MINUTES", "60"))
+    degeneration_action: str = os.getenv("DEGENERATION_ACTION", "stop").lower()
+    degeneration_threshold: float = float(os.getenv("DEGENERATION_THRESHOLD", "0.6"))
+    degeneration_archive_threshold: float = float(os.getenv("DEGENERATION_ARCHIVE_THRESHOLD", "0.92"))
+    degeneration_patience: int = int(os.getenv("DEGENERATION_PATIENCE", "2"))
+    degeneration_min_turns: int = int(os.getenv("DEGENERATION_MIN_TURNS", "2"))
+    degeneration_shingle: int = int(os.getenv("DEGENERATION_SHINGLE", "8"))
+    degeneration_max_reseeds: int = int(os.getenv("DEGENERATION_MAX_RESEEDS", "1"))
+    degeneration_archive_window: int = int(os.getenv("DEGENERATION_ARCHIVE_WINDOW", "10"))
+    live_stream_tokens: bool = os.getenv("LIVE_STREAM_TOKENS", "false").lower() in ("1", "true", "yes")
+    live_buffer_size: int = int(os.getenv("LIVE_BUFFER_SIZE", "256"))
+    live_poll_interval: float = float(os.getenv("LIVE_POLL_INTERVAL", "0.25"))
     auto_archive: bool = os.getenv("AUTO_ARCHIVE", "true").lower() in ("1", "true", "yes")
     max_new_tokens: int = int(os.getenv("MAX_NEW_TOKENS", "256"))
     temperature: float = float(os.getenv("TEMPERATURE", "0.7"))
     top_p: float = float(os.getenv("TOP_P", "0.95"))
     host: str = os.getenv("HOST", "0.0.0.0")
     port: int = int(os.getenv("PORT", "8000"))
+    http_pool_size: int = int(os.getenv("HTTP_POOL_SIZE", "20"))
+    http_keepalive_connections: int = int(os.getenv("HTTP_KEEPALIVE_CONNECTIONS", "10"))
+    http_keepalive_expiry: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    http2: bool = os.getenv("HTTP2", "true").lower() in ("1", "true", "yes")
+    http_timeout: float = float(os.getenv("HTTP_TIMEOUT", "120"))
+    workers: int = int(os.getenv("WORKERS", "1"))
+    state_dir: str = os.getenv("STATE_DIR", _default_state_dir())
+    archive_segment_max_bytes: int = int(os.getenv("ARCHIVE_SEGMENT_MAX_BYTES", str(8 * 1024 * 1024)))
+    archive_rotate_daily: bool = os.getenv("ARCHIVE_ROTATE_DAILY", "false").lower() in ("1", "true", "yes")
+    archive_compression: str = os.getenv("ARCHIVE_COMPRESSION", "auto")
+    archive_retention_days: int = int(os.getenv("ARCHIVE_RETENTION_DAYS", "0"))
+    archive_cache_ttl: float = float(os.getenv("ARCHIVE_CACHE_TTL", "5"))
+    hot_cache_size: int = int(os.getenv("HOT_CACHE_SIZE", "200"))
+    hot_cache_max_bytes: int = int(os.getenv("HOT_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+    hot_cache_check_interval: float = float(os.getenv("HOT_CACHE_CHECK_INTERVAL", "1"))
+    archive_ssr: bool = os.getenv("ARCHIVE_SSR", "true").lower() in ("1", "true", "yes")
+    migration_batch_size: int = int(os.getenv("MIGRATION_BATCH_SIZE", "500"))
+    migration_parallel: int = int(os.getenv("MIGRATION_PARALLEL", "4"))
+    profile_secret: Optional[str] = os.getenv("PROFILE_SECRET")
+    profile_slow_ms: float = float(os.getenv("PROFILE_SLOW_MS", "0"))
+    profile_interval_ms: float = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+    profile_continuous_interval_ms: float = float(os.getenv("PROFILE_CONTINUOUS_INTERVAL_MS", "50"))
+    profile_window_s: float = float(os.getenv("PROFILE_WINDOW_S", "600"))
+    profile_max_samples: int = int(os.getenv("PROFILE_MAX_SAMPLES", "200000"))
+    profile_dir: Optional[str] = os.getenv("PROFILE_DIR")
+    profile_max_files: int = int(os.getenv("PROFILE_MAX_FILES", "50"))
+    profile_max_bytes: int = int(os.getenv("PROFILE_MAX_BYTES", str(20 * 1024 * 1024)))
+    prewarm_clients: bool = os.getenv("PREWARM_CLIENTS", "true").lower() in ("1", "true", "yes")
 
 settings = Settings()
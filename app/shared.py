@@ -0,0 +1,161 @@
+"""
+Cross-process primitives for multi-worker deployments.
+
+Each uvicorn worker is its own process with its own module globals, so
+anything that must be coordinated between workers goes through the files
+kept under ``settings.state_dir``: advisory file locks, single-flight locks
+and a small SQLite-backed cache.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from .settings import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def state_dir() -> Path:
+    path = Path(settings.state_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _lock_fd(fd: int, blocking: bool) -> bool:
+    if fcntl is not None:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            return False
+        return True
+    while True:
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.01)
+
+
+def _unlock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return
+    os.lseek(fd, 0, os.SEEK_SET)
+    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def _held(lock_path: Path, blocking: bool) -> Iterator[bool]:
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        acquired = _lock_fd(fd, blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _unlock_fd(fd)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """
+    Exclusive lock guarding writes to ``path`` across processes and threads.
+    """
+    with _held(path.with_name(path.name + ".lock"), blocking=True):
+        yield
+
+
+@contextlib.contextmanager
+def single_flight(name: str) -> Iterator[bool]:
+    """
+    Non-blocking named lock. Yields False if another worker already holds it.
+    """
+    with _held(state_dir() / f"{name}.lock", blocking=False) as acquired:
+        yield acquired
+
+
+class SharedCache:
+    """
+    TTL key/value cache shared by every worker through one SQLite file.
+    Values are stored as JSON. Generation counters let writers invalidate
+    every cached read of a namespace at once.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or state_dir() / "cache.sqlite3"
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires REAL, value TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS generations (name TEXT PRIMARY KEY, value INTEGER)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Any:
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT expires, value FROM cache WHERE key = ?", (self._key(key),)
+            ).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        return json.loads(row[1])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        payload = json.dumps(value, ensure_ascii=True)
+        now = time.time()
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, expires, value) VALUES (?, ?, ?)",
+                (self._key(key), now + ttl, payload),
+            )
+            conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+
+    def generation(self, name: str) -> int:
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM generations WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, name: str) -> int:
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO generations (name, value) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                (name,),
+            )
+            row = conn.execute("SELECT value FROM generations WHERE name = ?", (name,)).fetchone()
+        return row[0]
+
+
+_CACHE: Optional[SharedCache] = None
+
+
+def shared_cache() -> SharedCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = SharedCache()
+    return _CACHE
@@ -99,7 +99,7 @@ async function loadConversation() {
     }
     const entry = await response.json();
     if (entry.error) {
-      setStatus("session not found.");
+      tailConversation(entryId);
       return;
     }
     const createdAt = entry.created_at ? `Logged ${entry.created_at}` : "Logged";
@@ -120,6 +120,53 @@ async function loadConversation() {
   }
 }
 
+function tailConversation(entryId) {
+  if (!window.EventSource) {
+    setStatus("session not found.");
+    return;
+  }
+  const source = new EventSource(`/v1/live/${entryId}`);
+  const pending = {};
+  let seen = false;
+  conversationLog.innerHTML = "";
+
+  function pendingLine(event) {
+    if (!pending[event.index]) {
+      pending[event.index] = renderConversationMessage({ speaker: event.speaker, content: "" }, event.index);
+      conversationLog.appendChild(pending[event.index]);
+    }
+    return pending[event.index];
+  }
+
+  source.addEventListener("start", () => {
+    seen = true;
+    setStatus("live session in progress...");
+  });
+  source.addEventListener("token", (msg) => {
+    const event = JSON.parse(msg.data);
+    const body = pendingLine(event).querySelector(".message-content");
+    body.textContent += event.text;
+  });
+  source.addEventListener("turn", (msg) => {
+    const event = JSON.parse(msg.data);
+    pendingLine(event).querySelector(".message-content").textContent = event.text;
+  });
+  source.addEventListener("done", (msg) => {
+    source.close();
+    const event = JSON.parse(msg.data);
+    setStatus(event.error ? "session failed." : "session complete.");
+    if (!event.error) {
+      loadConversation();
+    }
+  });
+  source.onerror = () => {
+    source.close();
+    if (!seen) {
+      setStatus("session not found.");
+    }
+  };
+}
+
 if (searchBtn) {
   searchBtn.addEventListener("click", () => loadArchive());
 }
@@ -142,5 +189,7 @@ if (searchInput) {
   });
 }
 
-loadArchive();
+if (!archiveList || !archiveList.dataset.rendered) {
+  loadArchive();
+}
 loadConversation();
@@ -0,0 +1,9 @@
+import json
+from app.archive import maintain_archive
+
+if __name__ == "__main__":
+    result = maintain_archive()
+    if result is None:
+        print("Supabase backend configured; nothing to compact.")
+    else:
+        print(json.dumps(result, indent=2))
@@ -0,0 +1,38 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from app import clients
+from app.migration import DIRECTIONS, migrate
+from app.settings import settings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy archive entries between JSONL and Supabase.")
+    parser.add_argument("direction", choices=DIRECTIONS, help="import: JSONL -> Supabase, export: Supabase -> JSONL")
+    parser.add_argument("--path", default=settings.archive_path, help="JSONL archive (default ARCHIVE_PATH)")
+    parser.add_argument("--table", default=settings.supabase_table or "conversations")
+    parser.add_argument("--batch-size", type=int, default=settings.migration_batch_size)
+    parser.add_argument("--parallel", type=int, default=settings.migration_parallel)
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    parser.add_argument("--no-verify", action="store_true", help="skip the count/checksum pass")
+    args = parser.parse_args()
+
+    client = clients.supabase_client()
+    if client is None:
+        sys.exit("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set.")
+    result = migrate(
+        args.direction,
+        client,
+        args.table,
+        Path(args.path),
+        batch_size=args.batch_size,
+        parallel=args.parallel,
+        restart=args.restart,
+        check=not args.no_verify,
+        on_progress=lambda n: print(f"\rcopied {n}", end="", file=sys.stderr, flush=True),
+    )
+    print(file=sys.stderr)
+    print(json.dumps(result, indent=2))
+    if result.get("verify") and not result["verify"]["ok"]:
+        sys.exit(1)
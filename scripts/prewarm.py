@@ -1,4 +1,4 @@
-from app.inference import load_model
+from app import clients
 if __name__ == "__main__":
-    load_model()
-    print("Model prewarmed.")
+    clients.warm()
+    print("Clients prewarmed.")
@@ -0,0 +1,117 @@
+"""
+Shared fixtures.
+
+Every test gets its own STATE_DIR and JSONL archive under ``tmp_path``, with
+the process-wide caches reset, so nothing leaks between tests or into the
+working tree. ``supabase`` swaps in ``FakeSupabase``, an in-memory table
+that understands the query builder calls the app makes.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pytest
+
+from app import archive, live, replica, shared
+from app.hot_cache import HotCache
+from app.settings import settings
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase"):
+        self.db = db
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.orders: List[Tuple[str, bool]] = []
+        self.limit_n: Optional[int] = None
+        self.written: Optional[List[Dict[str, Any]]] = None
+
+    def select(self, *_args):
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row[column] >= value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row[column] <= value)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def ilike(self, column, pattern):
+        needle = pattern.strip("%").lower()
+        self.filters.append(lambda row: needle in str(row.get(column, "")).lower())
+        return self
+
+    def or_(self, spec):
+        # Only the keyset form migration.supabase_entries sends.
+        created_at, entry_id = re.search(r'created_at\.eq\."(.*?)",id\.gt\."(.*?)"', spec).groups()
+        self.filters.append(lambda row: (row["created_at"], row["id"]) > (created_at, entry_id))
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def insert(self, item):
+        self.written = item if isinstance(item, list) else [item]
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.db.upserts += 1
+        self.written = rows
+        return self
+
+    def execute(self):
+        self.db.calls += 1
+        if self.written is not None:
+            self.db.add(*self.written)
+            return type("Response", (), {"data": self.written})()
+        rows = [row for row in self.db.rows.values() if all(f(row) for f in self.filters)]
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda row: row[column], reverse=desc)
+        if self.limit_n is not None:
+            rows = rows[: self.limit_n]
+        return type("Response", (), {"data": rows})()
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.calls = 0
+        self.upserts = 0
+
+    def add(self, *rows: Dict[str, Any]) -> None:
+        for row in rows:
+            # Stored as a copy, like a real round trip.
+            self.rows[str(row["id"])] = json.loads(json.dumps(row))
+
+    def table(self, _name):
+        return FakeQuery(self)
+
+
+@pytest.fixture(autouse=True)
+def archive_path(tmp_path, monkeypatch) -> Path:
+    monkeypatch.setattr(settings, "state_dir", str(tmp_path / "state"))
+    monkeypatch.setattr(settings, "archive_path", str(tmp_path / "conversations.jsonl"))
+    monkeypatch.setattr(settings, "supabase_url", None)
+    monkeypatch.setattr(shared, "_CACHE", None)
+    monkeypatch.setattr(replica, "_REPLICA", None)
+    monkeypatch.setattr(live, "_STORE", None)
+    monkeypatch.setattr(archive, "hot_cache", HotCache(200, 1 << 20, 1.0))
+    return tmp_path / "conversations.jsonl"
+
+
+@pytest.fixture
+def supabase(monkeypatch) -> FakeSupabase:
+    fake = FakeSupabase()
+    monkeypatch.setattr(archive, "_supabase_client", lambda: fake)
+    return fake
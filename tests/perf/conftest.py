@@ -0,0 +1,94 @@
+"""
+Lightweight benchmark harness for the perf suite.
+
+Timings are divided by a fixed pure-Python calibration workload measured at
+session start, so baselines carry over between machines of different speed.
+A benchmark fails when its normalised time exceeds the stored baseline by
+more than PERF_TOLERANCE (default 1.0, i.e. twice as slow), and also fails
+when it has no baseline at all, so a new size or benchmark has to be recorded
+before it counts as covered.
+
+The suite is deselected by default; run it with ``pytest -m perf``.
+
+    PERF_SIZES=1000,100000,1000000   archive sizes to build (default 1000)
+    PERF_UPDATE_BASELINES=1          record results into baselines.json
+"""
+
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+import pytest
+
+BASELINES = Path(__file__).with_name("baselines.json")
+TOLERANCE = float(os.getenv("PERF_TOLERANCE", "1.0"))
+UPDATE = os.getenv("PERF_UPDATE_BASELINES", "").lower() in ("1", "true", "yes")
+
+_RESULTS: Dict[str, float] = {}
+
+
+def _calibration_workload() -> None:
+    entry = {
+        "id": str(uuid.UUID(int=7)),
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "messages": [{"role": "user", "content": "neon rain on old glass " * 4}] * 6,
+        "preview": "neon rain on old glass",
+    }
+    for _ in range(2000):
+        item = json.loads(json.dumps(entry))
+        "needle" in item["preview"].lower()
+
+
+def _best_of(fn: Callable[[], Any], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+class Bench:
+    def __init__(self, unit: float, baselines: Dict[str, float]):
+        self.unit = unit
+        self.baselines = baselines
+
+    def __call__(self, name: str, fn: Callable[[], Any], rounds: int = 5, warmup: int = 1) -> float:
+        """
+        Best-of-``rounds`` time of ``fn`` in calibration units, checked against the baseline.
+        """
+        for _ in range(warmup):
+            fn()
+        score = _best_of(fn, rounds) / self.unit
+        _RESULTS[name] = score
+        if UPDATE:
+            return score
+        baseline = self.baselines.get(name)
+        assert baseline is not None, (
+            f"{name} has no baseline in {BASELINES.name} ({score:.4g} units); "
+            "record one with PERF_UPDATE_BASELINES=1"
+        )
+        limit = baseline * (1 + TOLERANCE)
+        assert score <= limit, (
+            f"{name} regressed: {score:.4g} units vs baseline {baseline:.4g} "
+            f"(limit {limit:.4g}, PERF_TOLERANCE={TOLERANCE})"
+        )
+        return score
+
+
+@pytest.fixture(scope="session")
+def bench() -> Bench:
+    unit = _best_of(_calibration_workload, rounds=7)
+    baselines = json.loads(BASELINES.read_text(encoding="utf-8")) if BASELINES.exists() else {}
+    return Bench(unit, baselines)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not UPDATE or not _RESULTS:
+        return
+    baselines = json.loads(BASELINES.read_text(encoding="utf-8")) if BASELINES.exists() else {}
+    baselines.update({name: float(f"{score:.4g}") for name, score in _RESULTS.items()})
+    BASELINES.write_text(json.dumps(dict(sorted(baselines.items())), indent=2) + "\n", encoding="utf-8")
@@ -0,0 +1,162 @@
+import json
+import os
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app import archive, dialogue, inference, segments, shared
+from app.degeneration import DegenerationDetector
+from app.hot_cache import HotCache
+from app.settings import settings
+
+pytestmark = pytest.mark.perf
+
+SIZES = [int(size) for size in os.getenv("PERF_SIZES", "1000").split(",") if size.strip()]
+_WORDS = "neon rain glass vent hum corridor light signal static relay copper dust lamp wire echo pulse".split()
+
+
+def _entry(i: int) -> dict:
+    messages = [
+        {"role": "user" if turn % 2 else "assistant", "speaker": f"ai{turn % 2 + 1}",
+         "content": f"entry {i} turn {turn}: the vent hums under neon rain on old glass."}
+        for turn in range(6)
+    ]
+    return {
+        "id": f"{i:08d}-0000-4000-8000-000000000000",
+        "created_at": f"2026-01-01T00:00:00.{i:07d}+00:00",
+        "messages": messages,
+        "preview": f"session {i} " + ("needle" if i % 100 == 0 else "haystack"),
+    }
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size}")
+def synthetic_archive(request, tmp_path_factory):
+    """
+    An archive of ``size`` entries: three compacted segments plus an active file.
+    """
+    size = request.param
+    root = tmp_path_factory.mktemp(f"archive{size}")
+    path = root / "conversations.jsonl"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(settings, "state_dir", str(root / "state"))
+        mp.setattr(settings, "archive_segment_max_bytes", 1)
+        mp.setattr(shared, "_CACHE", None)
+        chunk = -(-size // 4)
+        for start in range(0, size, chunk):
+            segments.rotate(path)
+            with path.open("a", encoding="utf-8") as handle:
+                handle.writelines(json.dumps(_entry(i)) + "\n" for i in range(start, min(size, start + chunk)))
+        segments.compact(path)
+    return size, path
+
+
+@pytest.fixture
+def archive_env(synthetic_archive, tmp_path, monkeypatch):
+    size, path = synthetic_archive
+    monkeypatch.setattr(settings, "archive_path", str(path))
+    monkeypatch.setattr(settings, "state_dir", str(tmp_path / "state"))
+    monkeypatch.setattr(settings, "supabase_url", None)
+    monkeypatch.setattr(settings, "archive_cache_ttl", 0)
+    monkeypatch.setattr(settings, "hot_cache_size", 0)
+    monkeypatch.setattr(shared, "_CACHE", None)
+    monkeypatch.setattr(archive, "hot_cache", HotCache(200, 8 << 20, 60.0))
+    return size
+
+
+def test_read_latest(bench, archive_env):
+    size = archive_env
+    assert len(archive.read_archive(limit=50)) == 50
+    bench(f"read_latest[{size}]", lambda: archive.read_archive(limit=50))
+
+
+def test_read_range(bench, archive_env):
+    size = archive_env
+    since = _entry(size - size // 10)["created_at"]
+    assert len(archive.read_archive(since=since)) == size // 10
+    bench(f"read_range[{size}]", lambda: archive.read_archive(since=since), rounds=3)
+
+
+def test_search(bench, archive_env):
+    size = archive_env
+    assert len(archive.read_archive(search="needle")) == -(-size // 100)
+    bench(f"search[{size}]", lambda: archive.read_archive(search="needle"), rounds=3)
+
+
+def test_lookup_by_id(bench, archive_env):
+    size = archive_env
+    oldest, newest = _entry(0)["id"], _entry(size - 1)["id"]
+    assert archive.get_archive_item(oldest)["id"] == oldest
+    bench(f"lookup_oldest[{size}]", lambda: archive.get_archive_item(oldest), rounds=3)
+    bench(f"lookup_newest[{size}]", lambda: archive.get_archive_item(newest), rounds=3)
+
+
+def test_hot_read(bench, archive_env, monkeypatch):
+    size = archive_env
+    monkeypatch.setattr(settings, "hot_cache_size", 200)
+    assert len(archive.read_archive(limit=50)) == 50
+
+    def reads():
+        for _ in range(100):
+            archive.read_archive(limit=50)
+
+    bench(f"hot_read[{size}]", reads)
+
+
+def test_append(bench, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "archive_path", str(tmp_path / "conversations.jsonl"))
+    monkeypatch.setattr(settings, "state_dir", str(tmp_path / "state"))
+    monkeypatch.setattr(settings, "supabase_url", None)
+    monkeypatch.setattr(shared, "_CACHE", None)
+    monkeypatch.setattr(archive, "hot_cache", HotCache(200, 8 << 20, 60.0))
+    messages = _entry(0)["messages"]
+
+    def appends():
+        for _ in range(50):
+            archive.append_dialogue(messages)
+
+    bench("append", appends)
+
+
+def test_prompt_assembly(bench):
+    messages = [{"role": "user" if i % 2 else "assistant", "content": f"turn {i}"} for i in range(40)]
+
+    def assemble():
+        for _ in range(500):
+            inference._split_system(inference._ensure_persona_system(messages))
+
+    bench("prompt_assembly", assemble)
+
+
+class StubMessages:
+    """Instant replies of unrelated word salad, so the repetition detector stays quiet."""
+
+    def __init__(self):
+        self.rng = random.Random(7)
+
+    def create(self, **req):
+        text = " ".join(self.rng.choice(_WORDS) for _ in range(40))
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=text)],
+            stop_reason="end_turn",
+            usage=SimpleNamespace(input_tokens=100, output_tokens=20),
+        )
+
+
+def test_dialogue_orchestration(bench, monkeypatch):
+    monkeypatch.setattr(settings, "mem0_enabled", False)
+    monkeypatch.setattr(settings, "live_stream_tokens", False)
+    client = SimpleNamespace(messages=StubMessages())
+
+    def run():
+        transcript = dialogue.run_dialogue(
+            num_exchanges=10,
+            model1="claude-x",
+            model2="claude-y",
+            anthropic_client=client,
+            publish=lambda event: None,
+            detector=DegenerationDetector(),
+        )
+        assert len(transcript) == 20
+
+    bench("dialogue_orchestration", run)
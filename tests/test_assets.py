@@ -0,0 +1,69 @@
+import gzip
+import time
+
+from app import assets
+
+
+def _static(tmp_path):
+    (tmp_path / "app.js").write_text("console.log('hi');\n" * 40, encoding="utf-8")
+    (tmp_path / "archive.html").write_text(
+        '<script src="/static/app.js"></script>\n'
+        '<div class="status" id="status">loading archive...</div>\n'
+        '<section id="archiveList" class="archive-log" data-mode="list"></section>\n',
+        encoding="utf-8",
+    )
+    return tmp_path
+
+
+def test_manifest_fingerprints_and_rewrites_pages(tmp_path):
+    manifest = assets.Manifest(_static(tmp_path))
+    hashed = manifest.names["app.js"]
+    assert hashed.startswith("app.") and hashed.endswith(".js") and hashed != "app.js"
+    assert f"/static/{hashed}".encode() in manifest.pages["archive.html"]
+
+    response = manifest.serve(hashed, "gzip, deflate", None)
+    assert response.headers["cache-control"] == assets.IMMUTABLE
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == (tmp_path / "app.js").read_bytes()
+    assert manifest.serve(hashed, "", response.headers["etag"]).status_code == 304
+    assert manifest.serve("app.js", "gzip;q=0", None).headers["cache-control"] == assets.REVALIDATE
+    assert "content-encoding" not in manifest.serve("app.js", "gzip;q=0", None).headers
+
+
+def test_archive_page_is_rendered_once_per_generation(tmp_path):
+    manifest = assets.Manifest(_static(tmp_path))
+    cache = assets.ArchivePageCache()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return [{"id": "a<b", "created_at": "2026-01-01", "preview": "<hello>"}]
+
+    variants, _ = cache.render(manifest.pages["archive.html"], "archive.html", 1, loader, ttl=60)
+    body = variants["identity"].decode()
+    assert 'data-rendered="1"' in body and "&lt;hello&gt;" in body and "Loaded 1 sessions." in body
+    cache.render(manifest.pages["archive.html"], "archive.html", 1, loader, ttl=60)
+    cache.render(manifest.pages["archive.html"], "archive.html", 2, loader, ttl=60)
+    assert len(loads) == 2
+    cache.render(manifest.pages["archive.html"], "archive.html", 2, loader, ttl=0)
+    assert len(loads) == 3
+
+
+def test_foreign_supabase_write_reaches_rendered_page(supabase, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app import server
+    from app.settings import settings
+
+    supabase.add({"id": "first", "created_at": "2026-01-01T00:00:00", "preview": "first row", "messages": []})
+    monkeypatch.setattr(settings, "replica_enabled", False)
+    monkeypatch.setattr(settings, "archive_ssr", True)
+    monkeypatch.setattr(settings, "archive_cache_ttl", 0.05)
+    monkeypatch.setattr(assets, "archive_pages", assets.ArchivePageCache())
+    client = TestClient(server.app)
+
+    assert "first row" in client.get("/").text
+    # Another instance inserts a row: this process's generation never moves.
+    supabase.add({"id": "second", "created_at": "2026-01-02T00:00:00", "preview": "second row", "messages": []})
+    time.sleep(0.1)
+    assert "second row" in client.get("/").text
@@ -0,0 +1,19 @@
+import pytest
+
+from app import clients
+from app.settings import settings
+
+
+def test_supabase_does_not_taint_shared_pool(monkeypatch):
+    pytest.importorskip("supabase")
+    monkeypatch.setattr(settings, "supabase_url", "https://example.supabase.co")
+    monkeypatch.setattr(settings, "supabase_service_role_key", "service-role-secret")
+    clients.close()
+    try:
+        clients.supabase_client().table("conversations")
+        shared = clients.http_client()
+        assert "apikey" not in shared.headers and "authorization" not in shared.headers
+        assert str(shared.base_url) == ""
+        assert clients.supabase_http_client() is not shared
+    finally:
+        clients.close()
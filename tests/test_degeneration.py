@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+from app import dialogue
+from app.degeneration import DegenerationDetector
+from app.settings import settings
+
+LOOP = """simulator@void:~/$ cat koan.txt
+not a file
+not empty
++------+
+| VOID |
++------+
+"""
+
+
+class ScriptedMessages:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def create(self, **req):
+        self.calls += 1
+        text = self.replies.pop(0) if self.replies else LOOP
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)], stop_reason="end_turn")
+
+
+def _run(monkeypatch, action, replies):
+    monkeypatch.setattr(settings, "degeneration_action", action)
+    monkeypatch.setattr(settings, "mem0_enabled", False)
+    messages = ScriptedMessages(replies)
+    detector = DegenerationDetector(threshold=0.6, patience=2, min_turns=2)
+    transcript = dialogue.run_dialogue(
+        num_exchanges=10,
+        model1="claude-a",
+        model2="claude-b",
+        anthropic_client=SimpleNamespace(messages=messages),
+        detector=detector,
+    )
+    return transcript, detector, messages
+
+
+def test_distinct_turns_do_not_trip():
+    detector = DegenerationDetector(threshold=0.6, patience=1, min_turns=0)
+    for text in ("ls -la /dev/self", "man enlightenment", "ps aux | grep ego", "printf truth"):
+        assert detector.observe(text * 4) is None
+
+
+def test_loop_stops_dialogue_early(monkeypatch):
+    transcript, detector, messages = _run(monkeypatch, "stop", ["opening move", "a reply"])
+    assert len(transcript) < 20 and messages.calls == len(transcript)
+    assert [event["action"] for event in detector.events] == ["stopped"]
+    assert detector.events[0]["reason"] == "repetition"
+
+
+def test_loop_is_reseeded_before_stopping(monkeypatch):
+    monkeypatch.setattr(settings, "degeneration_max_reseeds", 1)
+    transcript, detector, _ = _run(monkeypatch, "reseed", ["opening move", "a reply"])
+    assert [event["action"] for event in detector.events] == ["reseeded", "stopped"]
+    assert all("[operator]" not in turn["text"] for turn in transcript)
+
+
+def test_archive_near_duplicates_count():
+    entry = {"id": "old", "messages": [{"role": "user", "content": LOOP * 3}]}
+    detector = DegenerationDetector.from_archive([entry], threshold=0.6, patience=1, min_turns=0)
+    verdict = detector.observe(LOOP * 3)
+    assert verdict is not None and verdict.matched == "archive old"
+
+
+def test_archive_signatures_are_cached(monkeypatch):
+    from app import degeneration
+
+    calls = []
+    real = degeneration.simhash
+    monkeypatch.setattr(degeneration, "simhash", lambda features: calls.append(1) or real(features))
+    entry = {"id": "cached-entry", "messages": [{"role": "user", "content": LOOP}]}
+    DegenerationDetector.from_archive([entry])
+    DegenerationDetector.from_archive([entry])
+    assert len(calls) == 1
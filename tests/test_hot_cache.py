@@ -0,0 +1,48 @@
+from app import archive, segments, shared
+from app.hot_cache import HotCache
+from app.settings import settings
+
+
+def _setup(monkeypatch, size=3):
+    monkeypatch.setattr(settings, "hot_cache_size", size)
+    ring = HotCache(size, 1 << 20, check_interval=0.0)
+    monkeypatch.setattr(archive, "hot_cache", ring)
+    return ring
+
+
+def test_ring_is_bounded_and_decodes_lazily():
+    ring = HotCache(2, 1 << 20, 0.0)
+    ring.fill([{"id": str(i), "preview": f"p{i}"} for i in range(3)], generation=0)
+    assert [item["id"] for item in ring.latest(None)] == ["1", "2"]
+    assert not ring.complete
+    ring.push({"id": "3", "preview": "p3"}, generation=1)
+    assert ring.get("1") is None and ring.get("3") == {"id": "3", "preview": "p3"}
+
+
+def test_recent_reads_skip_storage(monkeypatch):
+    ring = _setup(monkeypatch)
+    for i in range(5):
+        archive.append_conversation([{"role": "user", "content": f"q{i}"}], "a")
+    assert [item["preview"] for item in archive.read_archive(limit=2)] == ["q3", "q4"]
+    assert len(ring) == 3
+
+    def boom(*_args, **_kwargs):
+        raise AssertionError("storage read")
+
+    monkeypatch.setattr(segments, "latest_items", boom)
+    archive.append_conversation([{"role": "user", "content": "q5"}], "a")
+    assert [item["preview"] for item in archive.read_archive(limit=3, search="Q")] == ["q3", "q4", "q5"]
+    newest = archive.read_archive(limit=1)[0]
+    assert archive.get_archive_item(newest["id"]) == newest
+
+
+def test_foreign_append_invalidates_ring(monkeypatch):
+    ring = _setup(monkeypatch)
+    archive.append_conversation([{"role": "user", "content": "mine"}], "a")
+    assert [item["preview"] for item in archive.read_archive(limit=3)] == ["mine"]
+    assert ring.complete
+    # Another worker appends: the shared generation moves without our push.
+    shared.shared_cache().bump("archive")
+    with archive.ensure_archive_dir().open("a", encoding="utf-8") as handle:
+        handle.write('{"id": "x", "created_at": "", "preview": "theirs"}\n')
+    assert [item["preview"] for item in archive.read_archive(limit=3)] == ["mine", "theirs"]
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from app import dialogue
+from app.live import LiveHub, LiveStore, SharedTail
+from app.settings import settings
+
+
+class StubMessages:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **req):
+        self.calls += 1
+        text = f"turn {self.calls}"
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)], stop_reason="end_turn")
+
+
+def test_slow_viewer_never_blocks_publisher():
+    hub = LiveHub(buffer_size=4)
+
+    async def scenario():
+        hub.start("s1")
+        sub = hub.subscribe("s1")
+
+        def produce():
+            for i in range(1000):
+                hub.publish("s1", {"type": "token", "index": 0, "text": str(i)})
+            hub.publish("s1", {"type": "turn", "index": 0, "text": "full"})
+            hub.finish("s1")
+
+        worker = threading.Thread(target=produce)
+        worker.start()
+        await asyncio.to_thread(worker.join, 5)
+        assert not worker.is_alive()
+        await asyncio.sleep(0.05)
+        events = []
+        while not sub.queue.empty():
+            events.append(sub.queue.get_nowait())
+        assert len(events) == 4 and sub.dropped > 0
+        assert events[-1]["type"] == "done"
+
+        late = hub.subscribe("s1")
+        replay = [late.queue.get_nowait()["type"] for _ in range(late.queue.qsize())]
+        assert replay == ["start", "turn", "done"]
+
+    asyncio.run(scenario())
+
+
+def test_generated_entry_is_published_live(monkeypatch):
+    monkeypatch.setattr(settings, "mem0_enabled", False)
+    monkeypatch.setattr(settings, "dialogue_exchanges", 2)
+    client = SimpleNamespace(messages=StubMessages())
+    monkeypatch.setattr(dialogue, "_ensure_clients", lambda: client)
+    hub = LiveHub()
+    monkeypatch.setattr(dialogue, "hub", hub)
+
+    entry = dialogue.generate_archive_entry()
+
+    session = hub._sessions[entry["id"]]
+    kinds = [event["type"] for event in session.history]
+    assert kinds == ["start", "turn", "turn", "turn", "turn", "done"]
+    assert session.history[-1]["entry_id"] == entry["id"]
+    assert [m["content"] for m in entry["messages"]] == ["turn 1", "turn 2", "turn 3", "turn 4"]
+
+
+def test_viewer_on_another_worker_tails_through_the_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "live_poll_interval", 0.01)
+    store = tmp_path / "live.sqlite3"
+    owner, other = LiveHub(store=LiveStore(store)), LiveHub(store=LiveStore(store))
+
+    async def scenario():
+        owner.start("s1", model_1="claude-x")
+        owner.publish("s1", {"type": "turn", "index": 0, "text": "one"})
+        assert await other.open("missing") is None
+        tail = await other.open("s1")
+        assert isinstance(tail, SharedTail)
+        assert [(await tail.get(1))["type"] for _ in range(2)] == ["start", "turn"]
+        assert [s["id"] for s in other.sessions()] == ["s1"]
+
+        owner.publish("s1", {"type": "token", "index": 1, "text": "tw"})
+        owner.publish("s1", {"type": "turn", "index": 1, "text": "two"})
+        owner.finish("s1", entry_id="s1")
+        events = [await tail.get(1) for _ in range(3)]
+        assert [e["type"] for e in events] == ["token", "turn", "done"]
+        assert events[1]["text"] == "two"
+
+    asyncio.run(scenario())
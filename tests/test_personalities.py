@@ -0,0 +1,48 @@
+import json
+import os
+
+from app import personalities
+from app.inference import _ensure_persona_system, _split_system
+from app.settings import settings
+
+
+def test_pair_prompts_are_precompiled():
+    a, b = personalities.by_id("nyx"), personalities.by_id("iris")
+    assert personalities.persona_system_for_ids("nyx", "iris") == personalities.system_prompt_for(a, b)
+    assert personalities.by_id("missing") is personalities.CHARACTERS[0]
+    assert personalities.persona_token_count("nyx", "iris") > 0
+
+
+def test_custom_personas_hot_reload(tmp_path, monkeypatch):
+    source = tmp_path / "personas.json"
+    source.write_text(json.dumps([{"id": "echo", "name": "Echo", "vibe": "repeats"}]), encoding="utf-8")
+    monkeypatch.setattr(settings, "personas_path", str(source))
+    try:
+        assert personalities.reload_personas()
+        assert personalities.by_id("echo").name == "Echo"
+        source.write_text(json.dumps([{"id": "echo", "name": "Echo II"}]), encoding="utf-8")
+        os.utime(source, (1, 1))
+        assert personalities.reload_personas()
+        assert personalities.by_id("echo").name == "Echo II"
+        assert "Echo II" in personalities.persona_system_for_ids("echo", "nyx")
+    finally:
+        monkeypatch.setattr(settings, "personas_path", None)
+        personalities.reload_personas(force=True)
+    assert "echo" not in {c.id for c in personalities.CHARACTERS}
+
+
+def test_reload_swaps_the_registry_instead_of_refilling_it():
+    index, characters = personalities._INDEX, personalities.CHARACTERS
+    snapshot = dict(index)
+    personalities.reload_personas(force=True)
+    # Readers holding the old objects keep a complete registry.
+    assert index == snapshot and len(characters) == len(snapshot)
+    assert personalities._INDEX is not index and personalities.CHARACTERS is not characters
+    assert personalities.by_id("iris").id == "iris"
+
+
+def test_default_system_injection_matches_prompt():
+    messages = _ensure_persona_system([{"role": "user", "content": "hi"}])
+    system, rest = _split_system(messages)
+    assert system == personalities.default_persona_system().strip()
+    assert rest == [{"role": "user", "content": "hi"}]
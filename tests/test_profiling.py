@@ -0,0 +1,124 @@
+import threading
+import time
+
+from app import profiling
+from app.settings import settings
+
+
+def _busy(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_sampler_captures_busy_thread_and_storage_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profile_max_files", 2)
+    sampler = profiling.Sampler(interval=0.002, window=5)
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,))
+    worker.start()
+    recording = sampler.start_recording()
+    time.sleep(0.2)
+    sampler.stop_recording(recording)
+    stop.set()
+    worker.join()
+
+    counts = recording.counts
+    assert not recording.truncated
+    assert any("test_profiling.py:_busy" in stack for stack in counts)
+    assert "test_profiling.py:_busy" in profiling.folded(counts)
+    assert profiling.flamegraph_svg(counts, "busy").startswith("<svg")
+
+    ids = [profiling.store(counts, {"path": f"/p{i}"}) for i in range(3)]
+    assert [p["id"] for p in profiling.list_profiles()] == ids[:0:-1]
+    assert profiling.profile_file(ids[0], "svg") is None
+    assert profiling.profile_file(ids[-1], "svg") is not None
+    assert profiling.profile_file("../etc", "svg") is None
+
+
+def test_stopped_recording_is_left_alone():
+    sampler = profiling.Sampler(interval=0.001, window=5)
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,))
+    worker.start()
+    try:
+        for _ in range(20):
+            recording = sampler.start_recording()
+            time.sleep(0.005)
+            sampler.stop_recording(recording)
+            snapshot = dict(recording.counts)
+            time.sleep(0.003)
+            assert recording.counts == snapshot
+    finally:
+        stop.set()
+        worker.join()
+
+
+def test_interning_tables_are_bounded(monkeypatch):
+    monkeypatch.setattr(profiling, "_INTERN_MAX", 4)
+    monkeypatch.setattr(profiling, "_LABELS", {})
+    monkeypatch.setattr(profiling, "_STACKS", {})
+    for n in range(20):
+        code = compile("import sys; frame = sys._getframe()", f"gen{n}.py", "exec")
+        scope = {}
+        exec(code, scope)
+        profiling._stack(scope["frame"])
+    assert len(profiling._LABELS) <= 4 and len(profiling._STACKS) <= 4
+
+
+def test_middleware_is_off_unless_configured():
+    from app import server
+
+    assert not (settings.profile_secret or settings.profile_slow_ms > 0)
+    assert not server.app.user_middleware
+
+
+def test_profile_listing_takes_the_profile_parameter(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app import server
+
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profile_secret", "s3")
+    client = TestClient(server.app)
+    assert client.get("/v1/profiles", params={"profile": "s3"}).json() == {"profiles": []}
+    assert client.get("/v1/profiles", params={"secret": "s3"}).json()["ok"] is False
+
+
+def test_profiling_requires_secret(monkeypatch):
+    monkeypatch.setattr(settings, "profile_secret", None)
+    assert not profiling.authorized("anything")
+    monkeypatch.setattr(settings, "profile_secret", "s3")
+    assert profiling.authorized("s3") and not profiling.authorized("nope")
+
+
+def test_continuous_ring_runs_slower_and_reports_truncation():
+    sampler = profiling.Sampler(interval=0.001, window=0.02, continuous_interval=0.01)
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,))
+    worker.start()
+    started = time.monotonic()
+    # Wait for the ring to wrap rather than a fixed time, so a loaded machine
+    # (fewer sampler ticks) does not make the test flaky.
+    deadline = started + 5
+    while sampler._dropped_until < started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    short_started = time.monotonic()
+    time.sleep(0.03)
+    ended = time.monotonic()
+    stop.set()
+    worker.join()
+
+    counts, truncated = sampler.collect(started, ended)
+    assert any("test_profiling.py:_busy" in stack for stack in counts)
+    ticks = sorted({t for t, _ in sampler._samples})
+    # The ring fills at the continuous cadence, not the 1 ms request interval.
+    assert all(b - a >= 0.009 for a, b in zip(ticks, ticks[1:]))
+    assert truncated
+    _, recent_truncated = sampler.collect(short_started, ended)
+    assert not recent_truncated
+
+    recording = profiling.Recording(limit=2)
+    for _ in range(3):
+        recording.add(("a",))
+    assert recording.samples == 2 and recording.truncated
@@ -0,0 +1,51 @@
+from app import archive, replica
+from app.settings import settings
+
+
+def _rows(n):
+    return [
+        {"id": str(i), "created_at": f"2026-01-01T00:00:{i:02d}", "preview": f"entry {i}", "messages": []}
+        for i in range(n)
+    ]
+
+
+def test_reads_come_from_replica_after_sync(supabase, monkeypatch):
+    supabase.add(*_rows(5))
+    monkeypatch.setattr(settings, "archive_cache_ttl", 0)
+    monkeypatch.setattr(settings, "replica_page_size", 2)
+
+    assert [item["id"] for item in archive.read_archive()] == ["0", "1", "2", "3", "4"]
+    calls = supabase.calls
+    assert [item["id"] for item in archive.read_archive(limit=2, search="ENTRY")] == ["0", "1"]
+    assert archive.get_archive_item("3")["id"] == "3"
+    assert supabase.calls == calls
+
+    written = archive.append_dialogue([{"role": "user", "content": "fresh"}])
+    assert archive.get_archive_item(written["id"])["preview"] == "fresh"
+    assert supabase.calls == calls + 1
+
+    supabase.add({"id": "late", "created_at": "2099-01-01T00:00:00", "preview": "late", "messages": []})
+    assert archive.sync_replica()
+    assert archive.read_archive()[-1]["id"] == "late"
+
+
+def test_sync_overlap_catches_late_commits(supabase, tmp_path, monkeypatch):
+    fake = supabase
+    fake.add({"id": "a", "created_at": "2026-01-01T00:10:00", "preview": "a", "messages": []})
+    monkeypatch.setattr(settings, "replica_sync_overlap", 120)
+    local = replica.Replica(tmp_path / "replica.sqlite3")
+    assert local.sync(fake, "t") == 1 and local.revision() == 1
+    # Stamped a minute before the watermark, committed after the last sync.
+    fake.add({"id": "b", "created_at": "2026-01-01T00:09:00", "preview": "b", "messages": []})
+    assert local.sync(fake, "t") == 1 and local.get("b") is not None
+    assert local.watermark() == "2026-01-01T00:10:00"
+    # Re-pulling unchanged rows is a no-op.
+    assert local.sync(fake, "t") == 0 and local.revision() == 2
+
+
+def test_latest_entries_are_newest_on_supabase(supabase, monkeypatch):
+    supabase.add(*_rows(5))
+    monkeypatch.setattr(settings, "replica_enabled", False)
+    assert [item["id"] for item in archive.latest_entries(2)] == ["3", "4"]
+    monkeypatch.setattr(settings, "replica_enabled", True)
+    assert [item["id"] for item in archive.latest_entries(2)] == ["3", "4"]
@@ -0,0 +1,178 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app import clients, routing
+from app.settings import settings
+
+
+class Overloaded(Exception):
+    status_code = 529
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+class FakeMessages:
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+        self.seen = []
+        self.retries = []
+
+    def create(self, **req):
+        self.seen.append(req["model"])
+        action = self.behaviour[req["model"]]
+        if isinstance(action, Exception):
+            raise action
+        time.sleep(action)
+        return SimpleNamespace(model=req["model"], content=[SimpleNamespace(type="text", text=req["model"])])
+
+    def stream(self, **req):
+        messages = self
+
+        class Manager:
+            def __enter__(self):
+                messages.seen.append(req["model"])
+                action = messages.behaviour[req["model"]]
+                if isinstance(action, Exception):
+                    raise action
+                return SimpleNamespace(model=req["model"])
+
+            def __exit__(self, *exc):
+                return False
+
+        return Manager()
+
+
+class FakeClient:
+    def __init__(self, messages, max_retries=2):
+        self.messages = messages
+        self.max_retries = max_retries
+
+    def with_options(self, max_retries):
+        self.messages.retries.append(max_retries)
+        return FakeClient(self.messages, max_retries)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    def install(behaviour):
+        messages = FakeMessages(behaviour)
+        monkeypatch.setattr(clients, "anthropic_client", lambda: FakeClient(messages))
+        return messages
+
+    monkeypatch.setattr(settings, "hedge_min_samples", 3)
+    monkeypatch.setattr(settings, "hedge_percentile", 0)
+    return install
+
+
+def test_fails_over_on_overload_and_cools_down(fake):
+    messages = fake({"primary": Overloaded(), "backup": 0})
+    router = routing.Router(routing.parse_targets("backup"))
+    assert router.create(model="primary", messages=[], max_tokens=8).model == "backup"
+    assert not router.stats(routing.Target("anthropic", "primary")).healthy()
+    assert router.plan("primary")[0].model == "backup"
+    assert messages.seen == ["primary", "backup"]
+    assert messages.retries and set(messages.retries) == {0}
+
+
+def test_streams_fail_over_and_are_timed(fake):
+    messages = fake({"primary": Overloaded(), "backup": 0})
+    router = routing.Router(routing.parse_targets("backup"))
+    with router.stream(model="primary", messages=[], max_tokens=8) as stream:
+        assert stream.model == "backup"
+    assert not router.stats(routing.Target("anthropic", "primary")).healthy()
+    assert len(router.stats(routing.Target("anthropic", "backup")).samples) == 1
+    with router.stream(model="primary", messages=[], max_tokens=8):
+        pass
+    # The cooling primary is tried last, so the second stream opens on backup directly.
+    assert messages.seen == ["primary", "backup", "backup"]
+
+
+def test_client_errors_are_not_retried(fake):
+    fake({"primary": BadRequest(), "backup": 0})
+    router = routing.Router(routing.parse_targets("backup"))
+    with pytest.raises(BadRequest):
+        router.create(model="primary", messages=[], max_tokens=8)
+
+
+def test_hedges_after_primary_percentile(fake, monkeypatch):
+    behaviour = {"primary": 0.01, "backup": 0.01}
+    fake(behaviour)
+    router = routing.Router(routing.parse_targets("backup"))
+    for _ in range(3):
+        router.create(model="primary", messages=[], max_tokens=8)
+    monkeypatch.setattr(settings, "hedge_percentile", 95)
+    behaviour["primary"] = 1.0
+    started = time.perf_counter()
+    assert router.create(model="primary", messages=[], max_tokens=8).model == "backup"
+    assert time.perf_counter() - started < 0.5
+
+
+def test_hedges_on_the_same_route_without_fallbacks(fake, monkeypatch):
+    calls = []
+
+    class Slow(FakeMessages):
+        def create(self, **req):
+            calls.append(req["model"])
+            # Only the first call after warm-up is slow; its duplicate is fast.
+            if len(calls) == 4:
+                time.sleep(1.0)
+                return SimpleNamespace(model="slow", content=[])
+            return super().create(**req)
+
+    messages = Slow({"primary": 0.01})
+    monkeypatch.setattr(clients, "anthropic_client", lambda: FakeClient(messages))
+    router = routing.Router([])
+    for _ in range(3):
+        router.create(model="primary", messages=[], max_tokens=8)
+    monkeypatch.setattr(settings, "hedge_percentile", 95)
+    started = time.perf_counter()
+    assert router.create(model="primary", messages=[], max_tokens=8).model == "primary"
+    assert time.perf_counter() - started < 0.5
+    assert calls == ["primary"] * 5
+
+
+def test_no_fallback_hedge_is_not_a_retry(fake, monkeypatch):
+    messages = fake({"primary": Overloaded()})
+    monkeypatch.setattr(settings, "hedge_percentile", 95)
+    with pytest.raises(Overloaded):
+        routing.Router([]).create(model="primary", messages=[], max_tokens=8)
+    assert messages.seen == ["primary"]
+
+
+def test_prefill_continuations_skip_openai(fake, monkeypatch):
+    fake({"primary": Overloaded()})
+    monkeypatch.setattr(clients, "openai_client", lambda: pytest.fail("OpenAI got a prefill"))
+    router = routing.Router(routing.parse_targets("openai:gpt-4o-mini"))
+    prefill = [{"role": "user", "content": "go"}, {"role": "assistant", "content": "half a"}]
+    with pytest.raises(Overloaded):
+        router.create(model="primary", messages=prefill, max_tokens=8)
+
+
+def test_parse_targets():
+    assert routing.parse_targets("claude-x, openai:gpt-4o-mini") == [
+        routing.Target("anthropic", "claude-x"),
+        routing.Target("openai", "gpt-4o-mini"),
+    ]
+
+
+def test_dialogue_records_the_route_that_answered(fake, monkeypatch):
+    from app import dialogue
+    from app.degeneration import DegenerationDetector
+
+    monkeypatch.setattr(settings, "mem0_enabled", False)
+    monkeypatch.setattr(settings, "live_stream_tokens", False)
+    fake({"claude-a": Overloaded(), "claude-b": 0})
+    router = routing.Router(routing.parse_targets("claude-b"))
+    transcript = dialogue.run_dialogue(
+        num_exchanges=1,
+        model1="claude-a",
+        model2="claude-a",
+        anthropic_client=routing.RoutedClient(router),
+        detector=DegenerationDetector(),
+    )
+    assert [turn["speaker"] for turn in transcript] == ["claude-b", "claude-b"]
+    assert transcript[0]["usage"]["route"] == "anthropic:claude-b"
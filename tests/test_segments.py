@@ -0,0 +1,54 @@
+import json
+
+from app import archive, segments
+from app.settings import settings
+
+
+def test_rotation_compaction_and_range_reads(archive_path, monkeypatch):
+    monkeypatch.setattr(settings, "archive_segment_max_bytes", 2048)
+    monkeypatch.setattr(settings, "archive_cache_ttl", 0)
+    monkeypatch.setattr(settings, "archive_compression", "gzip")
+    ids = [archive.append_dialogue([{"role": "user", "content": "y" * 600}])["id"] for _ in range(12)]
+    path = archive_path
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write("{not json\n")
+    archive.maintain_archive()
+
+    folder = segments.segments_dir(path)
+    assert list(folder.glob("*.jsonl.gz")) and not list(folder.glob("*.jsonl"))
+    items = archive.read_archive()
+    assert [item["id"] for item in items] == ids
+    assert archive.get_archive_item(ids[0])["id"] == ids[0]
+    latest = items[-1]["created_at"]
+    assert [item["id"] for item in archive.read_archive(since=latest)] == [ids[-1]]
+
+
+def test_latest_reads_scan_backwards_across_segments(archive_path, monkeypatch):
+    monkeypatch.setattr(settings, "archive_segment_max_bytes", 2048)
+    monkeypatch.setattr(settings, "archive_cache_ttl", 0)
+    ids = [archive.append_dialogue([{"role": "user", "content": "z" * 600}])["id"] for _ in range(12)]
+    path = archive_path
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write('{"id": "partial')
+    assert [item["id"] for item in archive.read_archive(limit=1)] == ids[-1:]
+    assert [item["id"] for item in archive.read_archive(limit=7)] == ids[-7:]
+    archive.maintain_archive()
+    assert [item["id"] for item in archive.read_archive(limit=7)] == ids[-7:]
+    assert [item["id"] for item in archive.read_archive(limit=50)] == ids
+    assert archive.read_archive(limit=0) == []
+
+
+def test_latest_items_decodes_only_the_tail_of_compacted_segments(archive_path, monkeypatch):
+    monkeypatch.setattr(settings, "archive_segment_max_bytes", 2048)
+    monkeypatch.setattr(settings, "archive_compression", "gzip")
+    ids = [archive.append_dialogue([{"role": "user", "content": "w" * 600}])["id"] for _ in range(12)]
+    path = archive_path
+    archive.maintain_archive()
+    active = len(path.read_text(encoding="utf-8").splitlines())
+
+    decoded = []
+    loads = json.loads
+    monkeypatch.setattr(segments.json, "loads", lambda s, *a, **k: decoded.append(1) or loads(s, *a, **k))
+    assert [item["id"] for item in segments.latest_items(path, active + 2)] == ids[-(active + 2):]
+    # Segment index files are JSON too; entry decodes are what must stay bounded.
+    assert len(decoded) - len(list(segments.segments_dir(path).glob("*.idx.json"))) == active + 2
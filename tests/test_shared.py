@@ -0,0 +1,38 @@
+import json
+import threading
+
+from app import archive, shared
+
+
+def test_single_flight_rejects_second_holder():
+    with shared.single_flight("job") as first:
+        with shared.single_flight("job") as second:
+            assert first and not second
+    with shared.single_flight("job") as again:
+        assert again
+
+
+def test_shared_cache_ttl_and_generation():
+    cache = shared.shared_cache()
+    cache.set("k", {"a": 1}, ttl=60)
+    assert cache.get("k") == {"a": 1}
+    cache.set("gone", 1, ttl=-1)
+    assert cache.get("gone") is None
+    assert cache.generation("archive") == 0
+    assert cache.bump("archive") == 1
+
+
+def test_concurrent_appends_do_not_interleave(archive_path):
+    def worker():
+        for _ in range(25):
+            archive.append_dialogue([{"role": "user", "content": "x" * 4096}])
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    lines = archive_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 100
+    assert all(json.loads(line)["messages"] for line in lines)
+    assert len(archive.read_archive()) == 100
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+from app import dialogue
+from app.settings import settings
+
+
+class ChunkedMessages:
+    """Replies in fixed-size chunks, reporting max_tokens until the reply is done."""
+
+    def __init__(self, reply, chunk):
+        self.reply = reply
+        self.chunk = chunk
+        self.requests = []
+
+    def create(self, **req):
+        self.requests.append(req)
+        messages = req["messages"]
+        done = messages[-1]["content"] if messages[-1]["role"] == "assistant" else ""
+        part = self.reply[len(done):len(done) + self.chunk]
+        finished = len(done) + len(part) >= len(self.reply)
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=part)],
+            stop_reason="end_turn" if finished else "max_tokens",
+            usage=SimpleNamespace(input_tokens=10, output_tokens=len(part)),
+        )
+
+
+def test_truncated_turn_is_continued(monkeypatch):
+    monkeypatch.setattr(settings, "dialogue_max_continuations", 5)
+    messages = ChunkedMessages("abcdefghij" * 3, chunk=12)
+    stats = {}
+    text = dialogue.chat_with_model(
+        model="claude-x",
+        messages=[{"role": "user", "content": "go"}],
+        anthropic_client=SimpleNamespace(messages=messages),
+        max_tokens=12,
+        stats=stats,
+    )
+    assert text == "abcdefghij" * 3
+    assert stats["continuations"] == 2 and stats["output_tokens"] == 30
+    assert stats["input_tokens"] == 30 and stats["stop_reason"] == "end_turn"
+    assert messages.requests[1]["messages"][-1] == {"role": "assistant", "content": "abcdefghijab"}
+
+
+def test_whitespace_at_the_cut_is_kept():
+    class Replies:
+        def __init__(self):
+            self.requests = []
+            self.parts = [("+--+\n", "max_tokens"), ("|  |\n+--+", "end_turn")]
+
+        def create(self, **req):
+            self.requests.append(req)
+            part, stop = self.parts.pop(0)
+            return SimpleNamespace(content=[SimpleNamespace(type="text", text=part)], stop_reason=stop, usage=None)
+
+    replies = Replies()
+    text = dialogue.chat_with_model(
+        model="claude-x",
+        messages=[{"role": "user", "content": "draw"}],
+        anthropic_client=SimpleNamespace(messages=replies),
+        max_tokens=4,
+    )
+    assert text == "+--+\n|  |\n+--+"
+    assert replies.requests[1]["messages"][-1] == {"role": "assistant", "content": "+--+"}
+
+
+def test_continuations_are_capped(monkeypatch):
+    monkeypatch.setattr(settings, "dialogue_max_continuations", 1)
+    stats = {}
+    text = dialogue.chat_with_model(
+        model="claude-x",
+        messages=[{"role": "user", "content": "go"}],
+        anthropic_client=SimpleNamespace(messages=ChunkedMessages("x" * 100, chunk=10)),
+        max_tokens=10,
+        stats=stats,
+    )
+    assert len(text) == 20 and stats["stop_reason"] == "max_tokens"
+
+
+def test_budget_follows_observed_lengths(monkeypatch):
+    monkeypatch.setattr(settings, "dialogue_max_tokens", 1024)
+    monkeypatch.setattr(settings, "dialogue_min_tokens", 64)
+    monkeypatch.setattr(settings, "dialogue_token_ceiling", 4096)
+    monkeypatch.setattr(settings, "dialogue_token_headroom", 1.5)
+    budget = dialogue.TokenBudget()
+    assert budget.for_speaker("ai1") == 1024
+    budget.observe("ai1", 100)
+    assert budget.for_speaker("ai1") == 150
+    budget.observe("ai1", 10000)
+    assert budget.for_speaker("ai1") == 4096
+    budget.observe("ai2", 10)
+    assert budget.for_speaker("ai2") == 64